@@ -0,0 +1,143 @@
+"""Chord frequencies and chord-to-chord transition counts over progression corpora.
+
+TransitionCounts accumulates, chunk by chunk, how often every chord occurs
+and how often each chord is followed by each other chord within a
+progression. Every chunk is one np.bincount over the chord indices and one
+over the flattened (from, to) pairs, so memory is constant whatever the
+corpus size. Counts from different chunks, files or worker processes add
+up with merge() (or +).
+
+count_corpus_file() runs over a binary corpus file (see corpus_file.py) on a
+process pool. Each worker memory-maps the file itself, so only row ranges
+and the small count arrays travel between processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from circle_model import get_layout
+
+# Chords counted per chunk (keeps temporaries around 100 MB)
+default_chunk_size = 1 << 23
+
+
+class TransitionCounts:
+    """Chord frequencies and transition counts, mergeable across chunks and workers."""
+
+    def __init__(self, num_points=24):
+        self.num_points = num_points
+        self.progressions = 0
+        self.frequencies = np.zeros(num_points, dtype=np.int64)  # Occurrences of every chord
+        self.transitions = np.zeros((num_points, num_points), dtype=np.int64)  # [from, to]
+
+    def __repr__(self):
+        return (f"TransitionCounts({self.num_points} points, {self.progressions} progressions, "
+                f"{self.frequencies.sum()} chords)")
+
+    def add_ragged(self, values, offsets):
+        """Counts progressions in the ragged layout (values may be a memmap)."""
+        n = self.num_points
+        offsets = np.asarray(offsets, dtype=np.int64)
+        values = np.asarray(values[offsets[0]:offsets[-1]], dtype=np.intp)
+        offsets = offsets - offsets[0]
+        self.progressions += len(offsets) - 1
+        self.frequencies += np.bincount(values, minlength=n)[:n]
+        # Pairs of consecutive chords, except those across a progression boundary
+        pairs = values[:-1] * n + values[1:]
+        keep = np.ones(len(pairs), dtype=bool)
+        ends = offsets[1:-1] - 1
+        keep[ends[(ends >= 0) & (ends < len(pairs))]] = False
+        self.transitions += np.bincount(pairs[keep], minlength=n * n)[:n * n].reshape(n, n)
+        return self
+
+    def add(self, progressions, fill=None):
+        """Counts a 2-D array with one progression per row, padded with fill."""
+        n = self.num_points
+        progressions = np.atleast_2d(np.asarray(progressions)).astype(np.intp)
+        present = np.ones(progressions.shape, dtype=bool) if fill is None else progressions != fill
+        self.progressions += len(progressions)
+        self.frequencies += np.bincount(progressions[present], minlength=n)[:n]
+        pairs = progressions[:, :-1] * n + progressions[:, 1:]
+        keep = present[:, :-1] & present[:, 1:]
+        self.transitions += np.bincount(pairs[keep], minlength=n * n)[:n * n].reshape(n, n)
+        return self
+
+    def add_chunks(self, values, offsets, chunk_size=None):
+        """Counts a large ragged corpus chunk_size chords at a time, in constant memory."""
+        for start, stop in chunk_rows(offsets, chunk_size):
+            self.add_ragged(values, offsets[start:stop + 1])
+        return self
+
+    def merge(self, other):
+        """Adds another TransitionCounts (of the same circle size) into this one."""
+        if other.num_points != self.num_points:
+            raise ValueError(f"Cannot merge counts of {other.num_points} points into {self.num_points}")
+        self.progressions += other.progressions
+        self.frequencies += other.frequencies
+        self.transitions += other.transitions
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        return self.copy().merge(other)
+
+    def copy(self):
+        counts = TransitionCounts(self.num_points)
+        return counts.merge(self)
+
+    def probabilities(self):
+        """Transition probabilities: each row divided by its total (rows without transitions stay 0)."""
+        totals = self.transitions.sum(axis=1, keepdims=True)
+        return np.divide(self.transitions, totals, out=np.zeros(self.transitions.shape), where=totals > 0)
+
+    def top(self, k=10):
+        """The k most common transitions as (from, to, count), most common first."""
+        flat = self.transitions.ravel()
+        order = np.argsort(-flat, kind="stable")[:k]
+        return [(int(i // self.num_points), int(i % self.num_points), int(flat[i])) for i in order if flat[i]]
+
+
+def chunk_rows(offsets, chunk_size=None):
+    """Splits ragged progressions into (start, stop) row ranges of about chunk_size chords each."""
+    chunk_size = chunk_size or default_chunk_size
+    offsets = np.asarray(offsets)
+    num_rows = len(offsets) - 1
+    starts = np.searchsorted(offsets[:-1], np.arange(offsets[0], offsets[-1], chunk_size), side="right") - 1
+    bounds = np.unique(np.concatenate([[0], np.maximum(starts, 0), [num_rows]]))
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def count_corpus(values, offsets, layout="extended", chunk_size=None):
+    """TransitionCounts of a ragged corpus, counted chunk by chunk."""
+    return TransitionCounts(get_layout(layout).num_points).add_chunks(values, offsets, chunk_size)
+
+
+def _count_rows(path, start, stop, chunk_size):
+    from corpus_file import read_corpus  # Workers open the file themselves
+
+    corpus = read_corpus(path)
+    counts = TransitionCounts(corpus.layout.num_points)
+    return counts.add_chunks(corpus.values, corpus.offsets[start:stop + 1], chunk_size)
+
+
+def count_corpus_file(path, workers=None, chunk_size=None):
+    """TransitionCounts of a binary corpus file, counted on a process pool.
+
+    The file is split into chunks of about chunk_size chords; each worker
+    memory-maps it and returns the counts of its chunks, which are merged.
+    """
+    from corpus_file import read_corpus
+
+    corpus = read_corpus(path)
+    counts = TransitionCounts(corpus.layout.num_points)
+    ranges = chunk_rows(corpus.offsets, chunk_size)
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    if workers <= 1:
+        return counts.add_chunks(corpus.values, corpus.offsets, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_count_rows, *zip(*[(path, start, stop, chunk_size) for start, stop in ranges])):
+            counts.merge(part)
+    return counts
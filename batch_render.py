@@ -0,0 +1,212 @@
+"""Headless rendering of progression diagrams to PNG or SVG files, in bulk.
+
+The circle and its chord labels are the same in every diagram, so a Renderer
+draws them once and caches the result; each image then only draws its
+progression and mirror polylines:
+
+* PNG (Agg): the circle is cached as a raster region and the labels as a
+  transparent layer. Each image restores the circle, draws the lines on top
+  and alpha-blends the label pixels over them.
+* SVG: the static document is rendered once and split where the lines go.
+  Each image renders only its lines and splices them between the two halves.
+
+render_files() spreads the images over worker processes, each with its own
+Renderer. It streams them into an output directory and holds only a few
+chunks of progressions in memory at a time.
+"""
+import io
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+from matplotlib.patches import Circle
+
+from circle_model import CircleModel
+from circle_style import label_fontsize, mirror_styles
+
+formats = ("png", "svg")
+
+# Progressions handed to a worker per task
+default_chunk_size = 64
+
+# Worker-process renderer, set up once by _init_worker
+_renderer = None
+
+
+class Renderer:
+    """Draws progressions (as chord indices) onto a cached circle-and-labels diagram."""
+
+    def __init__(self, circle=None, format="png", mirrors=(), size=6, dpi=100, title=None,
+                 compress_level=1, layout="extended"):
+        if format not in formats:
+            raise ValueError(f"Unknown image format: {format!r}")
+        self.circle = circle if circle is not None else CircleModel(layout)
+        self.format = format
+        self.compress_level = compress_level  # PNG zlib level: encoding dominates the cost per image
+        circle = self.circle
+        radius = circle.radius
+
+        self.fig = fig = Figure(figsize=(size, size), dpi=dpi)
+        self.canvas = FigureCanvasSVG(fig) if format == "svg" else FigureCanvasAgg(fig)
+        self.ax = ax = fig.add_axes([0, 0.08 if title else 0, 1, 0.84 if title else 1])
+        ax.set_xlim(-radius - 2, radius + 2)
+        ax.set_ylim(-radius - 2, radius + 2)
+        ax.set_aspect('equal')
+        ax.set_axis_off()
+        if title:
+            fig.suptitle(title, fontsize=20)
+
+        self.circle_patch = ax.add_patch(Circle(circle.center, radius, color='gray', fill=False, linewidth=4))
+        # Empty lines marking where the per-image lines go in the SVG document
+        layer_start, = ax.plot([], [], gid="progression-layer-start")
+        self.lines = {None: ax.plot([], [], 'k-', lw=2, clip_on=False)[0]}
+        self.lines.update((axis, ax.plot([], [], clip_on=False, **mirror_styles[axis])[0]) for axis in mirrors)
+        layer_end, = ax.plot([], [], gid="progression-layer-end")
+        self.markers = (layer_start, layer_end)
+        self.labels = [
+            ax.text(x, y, chord_label, fontsize=label_fontsize(circle.num_points), ha='center', va='center',
+                    bbox=dict(facecolor='white', edgecolor='black', boxstyle='round,pad=0.3'))
+            for chord_label, x, y in zip(circle.chords, circle.x_points, circle.y_points)
+        ]
+        if format == "svg":
+            self.cache_svg()
+        else:
+            self.cache_png()
+
+    def set_visible(self, static=True, labels=True, lines=True):
+        self.fig.patch.set_visible(static)
+        self.circle_patch.set_visible(static)
+        for label in self.labels:
+            label.set_visible(labels)
+        for line in self.lines.values():
+            line.set_visible(lines)
+
+    def cache_png(self):
+        """Caches the circle as a raster region and the label pixels with their alpha."""
+        canvas = self.canvas
+        self.set_visible(labels=False, lines=False)
+        canvas.draw()
+        self.background = canvas.copy_from_bbox(self.fig.bbox)
+
+        self.set_visible(static=False, lines=False)
+        canvas.draw()
+        layer = np.asarray(canvas.buffer_rgba()).reshape(-1, 4)
+        self.label_pixels = np.flatnonzero(layer[:, 3])
+        self.label_rgb = layer[self.label_pixels, :3].astype(np.float32)
+        self.label_alpha = layer[self.label_pixels, 3:].astype(np.float32) / 255
+        self.set_visible(labels=False)
+
+    def cache_svg(self):
+        """Renders the static document once, split at the (empty) line layer."""
+        self.set_visible(lines=False)
+        document = self.svg()
+        self.svg_markers = start, end = [f'<g id="{marker.get_gid()}"/>' for marker in self.markers]
+        self.svg_head = document[:document.index(start)]
+        self.svg_tail = document[document.index(end) + len(end):]
+        self.set_visible(static=False, labels=False)
+
+    def svg(self):
+        out = io.StringIO()
+        self.fig.savefig(out, format="svg", metadata={"Date": None})
+        return out.getvalue()
+
+    def set_progression(self, progression):
+        """Points the lines at the progression (chord indices) and its mirrors."""
+        circle = self.circle
+        positions = circle.label_positions[np.asarray(progression, dtype=np.intp)]
+        for axis, line in self.lines.items():
+            line_positions = positions if axis is None else circle.mirror_tables[axis][positions]
+            if len(line_positions) > 1:
+                line.set_data(circle.grid_x[line_positions], circle.grid_y[line_positions])
+            else:
+                line.set_data([], [])
+
+    def render_png(self, progression):
+        """Returns the diagram of one progression as an (height, width, 4) uint8 array.
+
+        The array is the canvas buffer itself, overwritten by the next render.
+        """
+        self.set_progression(progression)
+        canvas = self.canvas
+        canvas.restore_region(self.background)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+        image = np.asarray(canvas.buffer_rgba())
+        pixels = image.reshape(-1, 4)
+        under = pixels[self.label_pixels, :3]
+        pixels[self.label_pixels, :3] = (self.label_rgb * self.label_alpha
+                                         + under * (1 - self.label_alpha) + 0.5).astype(np.uint8)
+        return image
+
+    def render_svg(self, progression):
+        """Returns the SVG document of one progression as a string."""
+        self.set_progression(progression)
+        document = self.svg()
+        start, end = self.svg_markers
+        lines = document[document.index(start) + len(start):document.index(end)]
+        return f"{self.svg_head}{start}{lines}{end}{self.svg_tail}"
+
+    def save(self, progression, path):
+        if self.format == "svg":
+            with open(path, "w") as f:
+                f.write(self.render_svg(progression))
+        else:
+            imsave(path, self.render_png(progression), format="png",
+                   pil_kwargs={"compress_level": self.compress_level})
+
+
+def _init_worker(options):
+    global _renderer
+    _renderer = Renderer(**options)
+
+
+def _render_chunk(paths, progressions):
+    for path, progression in zip(paths, progressions):
+        _renderer.save(progression, path)
+    return len(paths)
+
+
+def render_files(progressions, out_dir, format="png", mirrors=(), workers=None, chunk_size=None,
+                 first_number=1, name_format="{:06d}", **options):
+    """Renders every progression (a sequence of chord indices) to its own file in out_dir.
+
+    Files are named name_format.format(number) plus the format's extension, numbering
+    the progressions from first_number. progressions may be any iterable (e.g. a
+    generator over a large file): chunks are rendered as they are read, with a
+    bounded number in flight. Other options go to Renderer. Returns the number
+    of files written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    options = dict(options, format=format, mirrors=tuple(mirrors))
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or default_chunk_size
+    numbers = itertools.count(first_number)
+    progressions = iter(progressions)
+
+    def chunks():
+        while True:
+            chunk = list(itertools.islice(progressions, chunk_size))
+            if not chunk:
+                return
+            paths = [os.path.join(out_dir, f"{name_format.format(next(numbers))}.{format}") for _ in chunk]
+            yield paths, chunk
+
+    if workers == 1:
+        _init_worker(options)
+        return sum(_render_chunk(paths, chunk) for paths, chunk in chunks())
+
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+        pending = set()
+        for paths, chunk in chunks():
+            if len(pending) >= 2 * workers:  # Bound the progressions held in memory
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                written += sum(future.result() for future in done)
+            pending.add(pool.submit(_render_chunk, paths, chunk))
+        written += sum(future.result() for future in pending)
+    return written
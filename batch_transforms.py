@@ -0,0 +1,114 @@
+"""Vectorized mirror and rotate transforms for whole corpora of progressions.
+
+Progressions here are chord indices on the unrotated circle (0 is "A", 1 is
+"F#m", ... as in circle_model.chords). A chain of transforms is folded into a
+single permutation table up front, so transforming any number of chords is one
+NumPy gather, optionally done in chunks to bound the temporary memory.
+
+Two layouts are supported:
+
+* a 2-D array with one progression per row, padded with a fill value;
+* a ragged layout: a flat ``values`` array with every progression back to
+  back, plus an ``offsets`` array where progression i is
+  ``values[offsets[i]:offsets[i + 1]]``.
+"""
+import numpy as np
+
+from circle_model import compose, get_layout, index_dtype
+
+# Default number of chords transformed per chunk (keeps temporaries around 64 MB)
+default_chunk_size = 1 << 23
+
+
+def transform_table(chain, num_points=24, layout=None):
+    """Folds a chain of transforms into one permutation table.
+
+    Each step is a mirror axis name of the layout ("horizontal", "vertical",
+    "diagonal", "diagonal_neg" by default), "clockwise" or "counterclockwise" for
+    a single rotate_circle step, or an int n to turn the labels n steps
+    counterclockwise (negative for clockwise). Steps are applied in order. The
+    tables come from the layout (by default the one with num_points points),
+    which computes them only once.
+    """
+    layout = get_layout(layout if layout is not None else num_points)
+    tables = [layout.rotation(0)]
+    for step in chain:
+        if isinstance(step, str) and step in layout.mirror_tables:
+            tables.append(layout.mirror_tables[step])
+        elif step == "counterclockwise":
+            tables.append(layout.rotation(1))
+        elif step == "clockwise":
+            tables.append(layout.rotation(-1))
+        elif isinstance(step, (int, np.integer)):
+            tables.append(layout.rotation(int(step)))
+        else:
+            raise ValueError(f"Unknown transform: {step!r}")
+    return compose(*tables)
+
+
+def _gather(table, values, out, chunk_size):
+    """Writes table[values] into out, chunk_size elements at a time."""
+    flat_values = values.reshape(-1)
+    flat_out = out.reshape(-1)
+    chunk_size = chunk_size or default_chunk_size
+    for start in range(0, flat_values.size, chunk_size):
+        stop = start + chunk_size
+        np.take(table, flat_values[start:stop], out=flat_out[start:stop])
+    return out
+
+
+def transform(progressions, chain, num_points=24, fill=None, chunk_size=None, out=None, layout=None):
+    """Applies a chain of transforms to an integer array of progressions of any shape.
+
+    Entries equal to fill (the padding of a 2-D array) are left unchanged. The
+    result has the smallest dtype that holds a chord index (uint8 for 24 chords)
+    and the fill value, unless out is given. layout (a name or Layout) replaces
+    num_points for circles with other labels or axes.
+    """
+    if layout is not None:
+        layout = get_layout(layout)
+        num_points = layout.num_points
+    table = transform_table(chain, num_points, layout)
+    progressions = np.ascontiguousarray(progressions)
+    if out is None:
+        dtype = table.dtype if fill is None else np.result_type(table.dtype, np.min_scalar_type(fill))
+        out = np.empty(progressions.shape, dtype=dtype)
+    table = table.astype(out.dtype, copy=False)
+
+    if fill is None:
+        return _gather(table, progressions, out, chunk_size)
+
+    # Route the padding through an extra table entry that maps to itself
+    padded_table = np.append(table, out.dtype.type(fill))
+    flat = progressions.reshape(-1)
+    flat_out = out.reshape(-1)
+    chunk_size = chunk_size or default_chunk_size
+    for start in range(0, flat.size, chunk_size):
+        chunk = flat[start:start + chunk_size]
+        chunk = np.where(chunk == fill, num_points, chunk)
+        np.take(padded_table, chunk, out=flat_out[start:start + chunk_size])
+    return out
+
+
+def transform_ragged(values, offsets, chain, num_points=24, chunk_size=None, out=None, layout=None):
+    """Applies a chain of transforms to progressions in the ragged layout.
+
+    Returns the transformed values and the (unchanged) offsets.
+    """
+    values = np.ascontiguousarray(values)
+    return transform(values, chain, num_points, chunk_size=chunk_size, out=out, layout=layout), offsets
+
+
+def to_ragged(progressions, num_points=24):
+    """Packs a sequence of progressions (lists of chord indices) into values and offsets."""
+    lengths = np.fromiter((len(progression) for progression in progressions), dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter((chord for progression in progressions for chord in progression),
+                         dtype=index_dtype(num_points), count=int(offsets[-1]))
+    return values, offsets
+
+
+def from_ragged(values, offsets):
+    """Splits the ragged layout back into one array per progression."""
+    return np.split(values, offsets[1:-1])
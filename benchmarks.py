@@ -0,0 +1,270 @@
+"""Reproducible benchmarks for the interactive hot paths and the transform engine.
+
+Runs headless on the Agg backend. Synthetic event streams (mouse moves,
+recording clicks, drags and rotations) are dispatched through the canvas
+callbacks of a CircleApp holding progressions of different lengths, and the
+per-event latency percentiles and artists drawn per event are reported,
+followed by microbenchmarks of the chord lookup, the mirror table gathers,
+the view cache and the batch transforms. Results are printed (or written) as JSON to compare commits:
+
+    python benchmarks.py --output bench.json
+
+--max-growth turns the event streams into a check: it fails when an event's
+median latency on the longest progression is more than that many times its
+median on the shortest one.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import numpy as np
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib.backend_bases import MouseEvent  # noqa: E402
+
+from batch_transforms import transform  # noqa: E402
+from circle_gui import CircleApp  # noqa: E402
+from circle_model import Progression, ViewCache  # noqa: E402
+from orbits import canonical_form  # noqa: E402
+
+default_sizes = (10, 100, 10_000)
+
+# Events always timed per kind, however long they take
+min_events = 3
+
+
+def percentiles(samples_ns):
+    """Summarizes latencies (in nanoseconds) as milliseconds."""
+    samples = np.asarray(samples_ns, dtype=float) / 1e6
+    if not len(samples):
+        return {"count": 0}
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {"count": len(samples), "mean_ms": samples.mean(), "p50_ms": p50, "p90_ms": p90,
+            "p99_ms": p99, "max_ms": samples.max()}
+
+
+class EventBench:
+    """Drives a CircleApp with synthetic events and records what each one costs."""
+
+    def __init__(self, size, rng, budget=10.0):
+        self.app = app = CircleApp()
+        self.rng = rng
+        self.budget = budget  # Seconds per event kind
+        # Repaint on every highlight change: the rate limiter would hide the cost
+        app.hover_max_rate = float("inf")
+        circle = app.circle
+        for position in rng.integers(0, circle.num_points, size):
+            app.progression.append(position)
+        app.draw_circle()
+        app.fig.canvas.draw()
+
+        # Count the artists painted per event and the full canvas draws
+        self.artists = 0
+        self.full_draws = 0
+        draw_artist = app.ax.draw_artist
+
+        def counting_draw_artist(artist):
+            self.artists += 1
+            draw_artist(artist)
+
+        app.ax.draw_artist = counting_draw_artist
+        app.fig.canvas.mpl_connect("draw_event", self.count_draw)
+
+    def count_draw(self, event):
+        self.full_draws += 1
+
+    def event_at(self, name, x, y):
+        px, py = self.app.ax.transData.transform((x, y))
+        return MouseEvent(name, self.app.fig.canvas, px, py, button=1)
+
+    def dispatch(self, name, x, y):
+        event = self.event_at(name, x, y)
+        self.app.fig.canvas.callbacks.process(name, event)
+
+    def measure(self, actions):
+        """Times each action; returns the latency summary and artists/full draws per event.
+
+        Stops early (after at least min_events) once the time budget is spent, since
+        every full draw of a long progression takes seconds.
+        """
+        samples = []
+        artists = []
+        full_draws = 0
+        deadline = time.perf_counter() + self.budget
+        for action in actions:
+            if len(samples) >= min_events and time.perf_counter() > deadline:
+                break
+            self.artists = 0
+            draws_before = self.full_draws
+            start = time.perf_counter_ns()
+            action()
+            samples.append(time.perf_counter_ns() - start)
+            artists.append(self.artists)
+            full_draws += self.full_draws - draws_before
+        result = percentiles(samples)
+        result["artists_per_event"] = float(np.mean(artists)) if artists else 0.0
+        result["full_draws"] = full_draws
+        return result
+
+    def hover_point(self):
+        """A point near a label half of the time (so the highlight moves), anywhere in the axes otherwise."""
+        radius = self.app.circle.radius
+        if self.rng.random() < 0.5:
+            x, y = self.label_point()
+            return x + self.rng.uniform(-0.05, 0.05) * radius, y + self.rng.uniform(-0.05, 0.05) * radius
+        r = self.rng.uniform(0, radius * 1.1)
+        theta = self.rng.uniform(0, 2 * np.pi)
+        return r * np.cos(theta), r * np.sin(theta)
+
+    def label_point(self):
+        circle = self.app.circle
+        return circle.grid_point(int(self.rng.integers(circle.num_points)))
+
+    def run(self, num_events):
+        app = self.app
+        results = {}
+
+        moves = [self.hover_point() for _ in range(num_events)]
+        results["mouse_move"] = self.measure(
+            [lambda p=p: self.dispatch("motion_notify_event", *p) for p in moves])
+
+        app.is_recording = True
+        clicks = [self.label_point() for _ in range(num_events)]
+        results["click"] = self.measure(
+            [lambda p=p: self.dispatch("button_press_event", *p) for p in clicks])
+        app.is_recording = False
+
+        app.is_dragging = True
+        self.dispatch("button_press_event", *app.progression.points[-1])  # Grab the last vertex
+        drags = [self.label_point() for _ in range(num_events)]
+        results["drag"] = self.measure(
+            [lambda p=p: self.dispatch("motion_notify_event", *p) for p in drags])
+        app.is_dragging = False
+        app.dragged_point_index = None
+
+        directions = self.rng.choice(["clockwise", "counterclockwise"], max(num_events // 10, min_events))
+        results["rotate"] = self.measure(
+            [lambda d=d: app.rotate_circle(None, d) for d in directions])
+
+        for axis, shown in app.show_mirror.items():
+            if not shown:
+                app.mirror_shape(None, axis)
+        results["draw_circle"] = self.measure([app.draw_circle] * max(num_events // 10, min_events))
+        results["hover_stats"] = dict(app.hover_stats)
+        matplotlib.pyplot.close(app.fig)
+        return results
+
+
+def check_growth(events, max_growth):
+    """Raises AssertionError if an event kind got more than max_growth times slower from the shortest to
+    the longest progression benchmarked."""
+    sizes = sorted(events, key=int)
+    shortest, longest = events[sizes[0]], events[sizes[-1]]
+    slower = {kind: longest[kind]["p50_ms"] / shortest[kind]["p50_ms"]
+              for kind in shortest if "p50_ms" in shortest[kind]}
+    too_slow = {kind: growth for kind, growth in slower.items() if growth > max_growth}
+    if too_slow:
+        raise AssertionError(f"latency grows with the progression length ({sizes[0]} -> {sizes[-1]} chords): "
+                             + ", ".join(f"{kind} {growth:.1f}x" for kind, growth in too_slow.items()))
+
+
+def time_call(func, repeat):
+    """Runs func repeat times; returns the per-call latency summary."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - start)
+    return percentiles(samples)
+
+
+def micro_benchmarks(rng, repeat):
+    app_circle = CircleApp().circle
+    matplotlib.pyplot.close("all")
+    results = {}
+
+    points = [(float(x), float(y)) for x, y in rng.uniform(-25, 25, (repeat, 2))]
+    it = iter(points * 2)
+    results["get_chord_from_point"] = time_call(lambda: app_circle.get_chord_from_point(*next(it)), repeat)
+
+    # The gathers the app runs to mirror a progression's grid positions
+    positions = rng.integers(0, app_circle.num_points, 100)
+    for axis, table in app_circle.mirror_tables.items():
+        results[f"mirror_table_{axis}_100_points"] = time_call(lambda t=table: t[positions], repeat)
+
+    progression = Progression(app_circle)
+    for position in rng.integers(0, 24, 10_000):
+        progression.append(position)
+    for axis, table in app_circle.mirror_tables.items():
+        progression.track(axis, table)
+    views = ViewCache(progression)
+    results["view_cache_hit_10000"] = time_call(lambda: views.get("vertical"), repeat)
+
+    def view_cache_miss():
+        views.entries.clear()  # As after an edit
+        return views.get("vertical")
+
+    results["view_cache_miss_10000"] = time_call(view_cache_miss, max(repeat // 100, 3))
+    results["progression_mirrored_10000"] = time_call(lambda: progression.mirrored("vertical"),
+                                                      max(repeat // 100, 3))
+
+    corpus = rng.integers(0, 24, (1_000_000, 8), dtype=np.uint8)
+    summary = time_call(lambda: transform(corpus, ["vertical", 2, "diagonal"]), 5)
+    summary["chords_per_s"] = corpus.size / (summary["p50_ms"] / 1e3)
+    results["batch_transform_8M_chords"] = summary
+    summary = time_call(lambda: canonical_form(corpus[:200_000]), 3)
+    summary["rows_per_s"] = 200_000 / (summary["p50_ms"] / 1e3)
+    results["canonical_form_200k_rows"] = summary
+    return results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "matplotlib": matplotlib.__version__, "backend": matplotlib.get_backend(),
+            "machine": platform.machine(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(default_sizes),
+                        help="progression lengths to benchmark the events against")
+    parser.add_argument("--events", type=int, default=50, help="events per kind and size")
+    parser.add_argument("--budget", type=float, default=10.0,
+                        help="seconds per event kind and size before stopping early")
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per microbenchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-micro", action="store_true", help="only run the event streams")
+    parser.add_argument("--max-growth", type=float,
+                        help="fail if an event is this many times slower on the longest progression")
+    parser.add_argument("-o", "--output", default="-", help="JSON output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    report = {"meta": metadata(), "config": vars(args), "events": {}}
+    for size in args.sizes:
+        report["events"][str(size)] = EventBench(size, rng, args.budget).run(args.events)
+    if not args.skip_micro:
+        report["micro"] = micro_benchmarks(rng, args.repeat)
+    if args.max_growth is not None:
+        check_growth(report["events"], args.max_growth)
+
+    text = json.dumps(report, indent=2, default=float)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
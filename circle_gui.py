@@ -0,0 +1,800 @@
+"""Interactive matplotlib front end for the extended circle of fifths.
+
+All chord geometry lives in circle_model; this module only turns mouse and
+button events into model calls and keeps the retained artists in sync.
+"""
+import itertools
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection
+from matplotlib.backend_bases import TimerBase
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import Bbox
+from matplotlib.widgets import Button
+
+from circle_model import CircleModel, Progression, ViewCache
+from circle_style import label_fontsize, mirror_styles
+from corpus_file import read_corpus, write_corpus
+from history import History
+
+original_text = "Selected Chords\n will be displayed here"
+
+
+class LabelSprites(Artist):
+    """The chord labels as cached RGBA images, pasted at whole-pixel positions.
+
+    Laying out a label's text and rounded box takes over a millisecond, so
+    drawing all 24 would use up two animation frames. Each label is rendered
+    once per text, color and dpi onto a transparent canvas, and then only
+    pasted while the labels move.
+    """
+
+    def __init__(self, labels):
+        super().__init__()
+        self.labels = labels
+        self.sprites = {}  # (text, color, dpi) -> (image with rows bottom-up, offset of its center)
+        self.set_animated(True)
+
+    def sprite(self, label):
+        patch = label.get_bbox_patch()
+        dpi = self.axes.figure.dpi
+        key = (label.get_text(), tuple(patch.get_facecolor()), dpi)
+        if key not in self.sprites:
+            fig = Figure(dpi=dpi)
+            fig.patch.set_alpha(0)
+            canvas = FigureCanvasAgg(fig)
+            text = fig.text(0.5, 0.5, label.get_text(), fontproperties=label.get_fontproperties(),
+                            ha='center', va='center',
+                            bbox=dict(facecolor=patch.get_facecolor(), edgecolor=patch.get_edgecolor(),
+                                      boxstyle=patch.get_boxstyle()))
+            canvas.draw()
+            box = text.get_bbox_patch().get_window_extent(canvas.get_renderer())
+            x0, y0 = int(np.floor(box.x0)) - 2, int(np.floor(box.y0)) - 2
+            x1, y1 = int(np.ceil(box.x1)) + 2, int(np.ceil(box.y1)) + 2
+            height = canvas.get_width_height()[1]
+            image = np.asarray(canvas.buffer_rgba())[height - y1:height - y0, x0:x1][::-1].copy()
+            center_x, center_y = fig.transFigure.transform((0.5, 0.5))
+            self.sprites[key] = (image, (center_x - x0, center_y - y0))
+        return self.sprites[key]
+
+    def prepare(self):
+        """Renders the sprites that are not cached yet, so that the first frames are not late."""
+        for label in self.labels:
+            self.sprite(label)
+
+    def draw(self, renderer):
+        positions = self.axes.transData.transform([label.get_position() for label in self.labels])
+        gc = renderer.new_gc()
+        for label, (x, y) in zip(self.labels, positions):
+            image, (dx, dy) = self.sprite(label)
+            renderer.draw_image(gc, round(x - dx), round(y - dy), image)
+        gc.restore()
+
+
+class CircleApp:
+    """The interactive figure: buttons, event handlers and the retained artists."""
+
+    # Hover repaints are limited to this many per second; faster events are coalesced
+    hover_max_rate = 60
+
+    # Which of several vertices on the clicked position a drag grabs: "most_recent" or "earliest"
+    drag_pick = "most_recent"
+
+    # Undo steps kept; older edits are forgotten
+    history_size = 1000
+
+    # Where the Save/Load Session buttons write and read, unless given to the app
+    session_path = "session.circ"
+
+    # Seconds the labels take to sweep to their place after a rotation (0 jumps at once)
+    rotation_duration = 0.25
+    # Chords per minute in play mode
+    playback_tempo = 90
+    # Frame rate of the rotation and playback animations
+    frame_rate = 60
+    # Chords listed per progression in the textbox; longer ones show their last chords only,
+    # so laying out the text costs the same however long the progression gets
+    textbox_chords = 12
+    # Segments drawn as one polyline; longer progressions draw each distinct segment once instead
+    max_polyline_segments = 1000
+
+    def __init__(self, circle=None, profiler=None, session_path=None):
+        self.circle = circle if circle is not None else CircleModel()
+        self.profiler = profiler  # instrumentation.Profiler, or None when not profiling
+        if session_path is not None:
+            self.session_path = session_path
+        self.progression = Progression(self.circle)
+        self.history = History(self.progression, max_edits=self.history_size)  # All edits go through it
+        # Every mirror is kept up to date by the edits (O(1) each) whether it is shown or not,
+        # and the cache turns them into arrays once per progression version
+        for axis, table in self.circle.mirror_tables.items():
+            self.progression.track(axis, table)
+        self.views = ViewCache(self.progression)
+
+        self.is_recording = False  # Track whether the recording is active or not
+        # Mirror axes with a toggle: the ones of mirror_styles that the layout has
+        self.mirror_axes = [axis for axis in mirror_styles if axis in self.circle.mirror_tables]
+        self.show_mirror = {axis: False for axis in self.mirror_axes}  # Track which mirrors are shown
+        self.highlighted_chord = None  # Track the currently highlighted chord
+
+        self.last_hover_paint = 0.0
+        self.pending_highlight = None  # Latest hover target waiting for the rate limiter
+        self.hover_timer = None
+        self.hover_stats = {"performed": 0, "suppressed": 0, "coalesced": 0}
+
+        # Animations: the label sweep (start time, start angles, angle deltas) and the
+        # playback (start time), both driven by one blitted FuncAnimation
+        self.animation = None
+        self.sweep = None
+        self.playback = None
+        self.played_chord = None  # Chord highlighted by the playback
+
+        # Corpus overlay (analytics.TransitionCounts): chord pairs as arcs, chords as heat spots
+        self.transitions = None
+        self.arc_pairs = np.zeros((0, 2), dtype=np.intp)  # (from, to) chord of every arc drawn
+
+        # Variables to track dragging mode and the points being dragged
+        self.is_dragging = False
+        self.dragged_point_index = None  # The index of the point being dragged
+
+        # Retained artists, created once by init_artists() and only updated afterwards
+        self.label_artists = []
+        self.progression_line = None
+        self.mirror_lines = {}
+        # Cached rasters for blitting; they cover the whole figure because labels
+        # near the edge of the circle stick out of the axes
+        self.clean_background = None  # Everything but the animated artists and the textbox
+        self.background = None  # The clean background plus the textbox
+        self.line_layer = None  # The background plus the progression and mirror lines
+
+        self.fig, self.ax = plt.subplots(figsize=(10, 7))
+        plt.subplots_adjust(bottom=0.15, right=0.8)  # Adjust space for the textbox
+        if profiler is not None:
+            # Records every callback the canvas dispatches, whenever it was connected
+            profiler.attach(self.fig.canvas)
+            profiler.attach_axes(self.ax)
+
+        # Textbox for displaying chords; animated, so that a new text is painted into the
+        # cached background instead of costing a full canvas draw
+        textbox_ax = self.fig.add_axes([0.85, 0.2, 0, 6])  # Position for textbox
+        textbox_ax.axis("off")  # Hide the axes
+        self.textbox = textbox_ax.text(0.1, 0.1, original_text,
+                                       horizontalalignment='center', verticalalignment='center',
+                                       fontsize=12, color='black', animated=True)
+
+        self.init_buttons()
+        self.init_artists()
+        if not self.fig.canvas.supports_blit:
+            # Nothing paints animated artists without blitting: let the full draws paint them all
+            for artist in [self.textbox, self.transition_arcs, self.chord_heat, self.progression_line,
+                           *self.mirror_lines.values(), self.playhead, *self.label_artists]:
+                artist.set_animated(False)
+        self.label_angles = self.circle.angles.copy()  # Where the labels are drawn, mid-sweep too
+        self.draw_circle()
+
+        canvas = self.fig.canvas
+        # Headless canvases (Agg, ...) have timers that never fire: no animations there
+        self.can_animate = canvas.supports_blit and type(canvas.new_timer()) is not TimerBase
+        canvas.mpl_connect('draw_event', self.on_draw)
+        # Connect the drag and mouse click events
+        canvas.mpl_connect('button_press_event', self.on_mouse_click)
+        canvas.mpl_connect('motion_notify_event', self.on_drag)
+        canvas.mpl_connect('button_press_event', self.on_click)
+        canvas.mpl_connect('motion_notify_event', self.on_mouse_move)
+
+    def init_buttons(self):
+        """Creates the buttons with more centered positions and connects their handlers."""
+        fig = self.fig
+        ax_start = fig.add_axes([0.1, 0.02, 0.2, 0.05])
+        ax_stop = fig.add_axes([0.3, 0.02, 0.2, 0.05])
+        ax_clear = fig.add_axes([0.5, 0.02, 0.2, 0.05])
+        ax_rotate_cw = fig.add_axes([0.7, 0.02, 0.2, 0.025])
+        ax_rotate_ccw = fig.add_axes([0.7, 0.045, 0.2, 0.025])
+
+        ax_mirror = fig.add_axes([0.1, 0.07, 0.2, 0.05])
+        ax_mirror_vertical = fig.add_axes([0.3, 0.07, 0.2, 0.05])
+        ax_mirror_diagonal = fig.add_axes([0.5, 0.07, 0.2, 0.05])
+        ax_mirror_diagonal_neg = fig.add_axes([0.7, 0.07, 0.2, 0.05])
+
+        ax_undo = fig.add_axes([0.1, 0.8, 0.1, 0.05])
+        ax_redo = fig.add_axes([0.2, 0.8, 0.1, 0.05])
+        ax_save = fig.add_axes([0.8, 0.33, 0.1, 0.05])
+        ax_load = fig.add_axes([0.8, 0.27, 0.1, 0.05])
+        ax_drag_mode = fig.add_axes([0.8, 0.15, 0.1, 0.05])
+        ax_play = fig.add_axes([0.8, 0.21, 0.1, 0.05])
+
+        # Keep references to the buttons, otherwise they stop responding
+        self.btn_start = Button(ax_start, 'Start Recording')
+        self.btn_stop = Button(ax_stop, 'Stop Recording')
+        self.btn_clear = Button(ax_clear, 'Clear Circle')
+        self.btn_rotate_cw = Button(ax_rotate_cw, 'Rotate Clockwise')
+        self.btn_rotate_ccw = Button(ax_rotate_ccw, 'Rotate Counterclockwise')
+        self.btn_mirror = Button(ax_mirror, 'Mirror Horizontal')
+        self.btn_mirror_vertical = Button(ax_mirror_vertical, 'Mirror Vertical')
+        self.btn_mirror_diagonal = Button(ax_mirror_diagonal, 'Mirror Diagonal 1')
+        self.btn_mirror_diagonal_neg = Button(ax_mirror_diagonal_neg, 'Mirror Diagonal 2')
+        self.btn_undo = Button(ax_undo, 'Undo')
+        self.btn_redo = Button(ax_redo, 'Redo')
+        self.btn_save = Button(ax_save, 'Save Session')
+        self.btn_load = Button(ax_load, 'Load Session')
+        self.btn_drag_mode = Button(ax_drag_mode, 'Drag Mode')
+        self.btn_play = Button(ax_play, 'Play')
+
+        self.on_clicked(self.btn_start, self.start_recording)
+        self.on_clicked(self.btn_stop, self.stop_recording)
+        self.on_clicked(self.btn_clear, self.clear_circle)
+        self.on_clicked(self.btn_rotate_cw, lambda event: self.rotate_circle(event, "clockwise"))
+        self.on_clicked(self.btn_rotate_ccw, lambda event: self.rotate_circle(event, "counterclockwise"))
+        mirror_buttons = {"horizontal": self.btn_mirror, "vertical": self.btn_mirror_vertical,
+                          "diagonal": self.btn_mirror_diagonal, "diagonal_neg": self.btn_mirror_diagonal_neg}
+        for axis, button in mirror_buttons.items():
+            if axis in self.show_mirror:
+                self.on_clicked(button, lambda event, axis=axis: self.mirror_shape(event, axis))
+            else:
+                # The layout has no such mirror: grey the button out and ignore its clicks
+                button.set_active(False)
+                button.label.set_color('0.6')
+        # Connect the undo button to the undo handler
+        self.on_clicked(self.btn_undo, self.undo_last_point)
+        self.on_clicked(self.btn_redo, self.redo_last_edit)
+        self.on_clicked(self.btn_save, self.on_save_session)
+        self.on_clicked(self.btn_load, self.on_load_session)
+        self.on_clicked(self.btn_drag_mode, self.enter_drag_mode)
+        self.on_clicked(self.btn_play, self.toggle_playback)
+
+    def on_clicked(self, button, handler):
+        """Connects a button handler, recording its calls under the button label when profiling."""
+        if self.profiler is not None:
+            handler = self.profiler.wrap(f"clicked:{button.label.get_text()}", handler)
+        return button.on_clicked(handler)
+
+    def show(self):
+        plt.show()
+
+    def update_textbox(self):
+        """Updates the textbox with the clicked and transformed chords."""
+        positions = self.progression.positions
+        selected_chords_text = f"Selected Chords:\n{self.chord_list(positions)}" if positions else "No chords selected."
+        transformed_chords_text = "\n\n".join(
+            f"Transformed Chords ({axis}):\n{self.chord_list(positions)}"
+            for axis, positions in self.mirror_views().items() if len(positions)
+        ) or "No transformation applied."
+
+        self.set_text(f"{selected_chords_text}\n\n{transformed_chords_text}")
+
+    def chord_list(self, positions):
+        """Names of the chords under the last textbox_chords grid positions, after a count of the others."""
+        shown = positions[-self.textbox_chords:]
+        names = self.circle.chords
+        text = ", ".join(names[i] for i in self.circle.chord_table[shown])
+        hidden = len(positions) - len(shown)
+        return f"\u2026 ({hidden} more), {text}" if hidden else text
+
+    def set_text(self, text):
+        """Shows a new text in the textbox (on screen with the next refresh())."""
+        if text == self.textbox.get_text():
+            return
+        self.textbox.set_text(text)
+        if self.clean_background is not None and self.fig.canvas.supports_blit:
+            self.paint_textbox()
+
+    def paint_textbox(self):
+        """Paints the textbox into the cached background, so that it is laid out once per text."""
+        canvas = self.fig.canvas
+        canvas.restore_region(self.clean_background)
+        self.fig.draw_artist(self.textbox)
+        self.background = canvas.copy_from_bbox(self.fig.bbox)
+
+    def init_artists(self):
+        """Creates the static layer and every dynamic artist exactly once."""
+        ax = self.ax
+        circle = self.circle
+        radius = circle.radius
+        ax.set_xlim(-radius - 2, radius + 2)
+        ax.set_ylim(-radius - 2, radius + 2)
+        ax.set_aspect('equal')
+        ax.set_xticks([])  # Hide x ticks
+        ax.set_yticks([])  # Hide y ticks
+        ax.set_title(circle.layout.title, fontsize=30)
+
+        # Static layer: the circle itself never changes
+        ax.add_patch(plt.Circle(circle.center, radius, color='gray', fill=False, linewidth=4))
+
+        # Dynamic layer: animated artists are skipped by a normal canvas draw and
+        # painted on top of the cached background by refresh()
+        self.progression_line, = ax.plot([], [], 'k-', lw=2, animated=True)
+        self.mirror_lines = {axis: ax.plot([], [], animated=True, **mirror_styles[axis])[0]
+                             for axis in self.mirror_axes}
+        # Corpus overlay, under the progression: one collection of all the arcs and one of the chords
+        self.transition_arcs = ax.add_collection(LineCollection([], cmap='plasma', alpha=0.6, capstyle='round',
+                                                                animated=True))
+        self.chord_heat = ax.scatter([], [], c=[], cmap='YlOrRd', alpha=0.6, linewidths=0, animated=True)
+        # Marks the vertex being played
+        self.playhead, = ax.plot([], [], 'o', color='limegreen', markersize=16, alpha=0.7, animated=True)
+        self.label_artists = [
+            ax.text(x, y, chord_label, fontsize=label_fontsize(circle.num_points), ha='center', va='center',
+                    animated=True, bbox=dict(facecolor='white', edgecolor='black', boxstyle='round,pad=0.3'))
+            for chord_label, x, y in zip(circle.chords, circle.x_points, circle.y_points)
+        ]
+        # Stand-ins for the labels while they are animated
+        self.label_sprites = ax.add_artist(LabelSprites(self.label_artists))
+
+    def paint_lines(self):
+        """Paints the lines over the restored background and keeps the result for label repaints."""
+        for line in [self.transition_arcs, self.chord_heat, self.progression_line, *self.mirror_lines.values(),
+                     self.playhead]:
+            self.ax.draw_artist(line)
+        # Keep the lines-only raster so a label can be repainted without touching the lines
+        self.line_layer = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def paint_dynamic(self):
+        """Paints the animated artists over the restored background (lines below labels)."""
+        self.paint_lines()
+        for label in self.label_artists:
+            self.ax.draw_artist(label)
+
+    def on_draw(self, event):
+        """Re-captures the background after every full canvas draw (resize, button update, ...)."""
+        canvas = self.fig.canvas
+        if not canvas.supports_blit:
+            return
+        self.clean_background = canvas.copy_from_bbox(self.fig.bbox)
+        self.paint_textbox()
+        self.paint_dynamic()
+
+    def refresh(self):
+        """Repaints only the dynamic artists on top of the cached background."""
+        canvas = self.fig.canvas
+        if self.background is None or not canvas.supports_blit:
+            canvas.draw_idle()  # No background yet (or no blitting): fall back to a full draw
+            return
+        canvas.restore_region(self.background)
+        self.paint_dynamic()
+        canvas.blit(self.fig.bbox)
+
+    def draw_circle(self):
+        """Updates the chord labels and lines in place and repaints them."""
+        # Move the labels to the (possibly rotated) chord positions, unless they are still sweeping there
+        if self.sweep is None:
+            self.place_labels()
+        for i, label in enumerate(self.label_artists):
+            label.get_bbox_patch().set_facecolor(self.label_color(i))
+
+        # A single line artist through the clicked points, whatever the progression length
+        self.set_line_positions(self.progression_line, self.progression.positions)
+
+        # Draw mirrored shape for each enabled mirror
+        for axis, line in self.mirror_lines.items():
+            self.set_line_positions(line, self.views.get(axis) if self.show_mirror[axis] else [])
+
+        self.refresh()
+
+    def place_labels(self):
+        """Puts the labels at the chord positions for the current rotation."""
+        self.label_angles = self.circle.angles.copy()
+        for i, label in enumerate(self.label_artists):
+            label.set_position(self.circle.point(i))
+        self.update_overlay()
+
+    def show_transitions(self, counts):
+        """Overlays a corpus's chord frequencies and transitions (an analytics.TransitionCounts).
+
+        Every pair of chords that follow each other in either order gets one
+        arc, colored and thickened by how often they do; every chord gets a
+        spot sized and colored by how often it occurs.
+        """
+        if counts.num_points != self.circle.num_points:
+            raise ValueError(f"Counts of {counts.num_points} points do not fit a circle of {self.circle.num_points}")
+        self.transitions = counts
+        weights = np.triu(counts.transitions + counts.transitions.T, k=1)
+        pairs = np.argwhere(weights)
+        weights = weights[pairs[:, 0], pairs[:, 1]]
+        order = np.argsort(weights, kind="stable")  # Common arcs on top
+        self.arc_pairs = pairs[order]
+        strength = weights[order] / weights.max() if len(weights) else weights.astype(float)
+        self.transition_arcs.set_array(strength)
+        self.transition_arcs.set_linewidths(0.5 + 5 * strength)
+        frequencies = counts.frequencies / max(counts.frequencies.max(), 1)
+        self.chord_heat.set_array(frequencies)
+        self.chord_heat.set_sizes(1500 * frequencies)
+        self.update_overlay()
+        self.refresh()
+
+    def hide_transitions(self):
+        self.transitions = None
+        self.arc_pairs = np.zeros((0, 2), dtype=np.intp)
+        self.update_overlay()
+        self.refresh()
+
+    def update_overlay(self):
+        """Bends the arcs between the labels where they are drawn now (mid-sweep too)."""
+        circle = self.circle
+        if self.transitions is None:
+            self.transition_arcs.set_segments([])
+            self.chord_heat.set_offsets(np.zeros((0, 2)))
+            return
+        center = np.asarray(circle.center, dtype=float)
+        points = center + circle.radius * np.column_stack([np.cos(self.label_angles), np.sin(self.label_angles)])
+        self.chord_heat.set_offsets(points)
+        # Quadratic Bezier curves whose control point is pulled most of the way to the center
+        start, end = points[self.arc_pairs[:, 0]], points[self.arc_pairs[:, 1]]
+        control = center + 0.25 * ((start + end) / 2 - center)
+        t = np.linspace(0, 1, 24)[None, :, None]
+        self.transition_arcs.set_segments((1 - t) ** 2 * start[:, None] + 2 * (1 - t) * t * control[:, None]
+                                          + t ** 2 * end[:, None])
+
+    def label_color(self, index):
+        """Played chords are green and the hovered one yellow."""
+        if index == self.played_chord:
+            return 'lightgreen'
+        return 'yellow' if index == self.highlighted_chord else 'white'
+
+    def set_line_positions(self, line, positions):
+        """Sets a polyline through the given grid positions (nothing is drawn for fewer than two).
+
+        Past max_polyline_segments, every distinct segment is drawn once, with NaN gaps between
+        them: a long progression retraces the same chord pairs, and painting it then costs no
+        more than the circle has pairs.
+        """
+        circle = self.circle
+        if len(positions) < 2:
+            line.set_data([], [])
+        elif len(positions) - 1 <= self.max_polyline_segments:
+            line.set_data(circle.grid_x[positions], circle.grid_y[positions])
+        else:
+            positions = np.asarray(positions, dtype=np.intp)
+            starts = np.minimum(positions[:-1], positions[1:])
+            ends = np.maximum(positions[:-1], positions[1:])
+            pairs = np.unique(starts[starts != ends] * circle.num_points + ends[starts != ends])
+            starts, ends = np.divmod(pairs, circle.num_points)
+            gaps = np.full(len(pairs), np.nan)
+            line.set_data(np.column_stack([circle.grid_x[starts], circle.grid_x[ends], gaps]).ravel(),
+                          np.column_stack([circle.grid_y[starts], circle.grid_y[ends], gaps]).ravel())
+
+    def mirror_views(self):
+        """Positions of every shown mirror overlay, by axis (cached until the next edit)."""
+        return {axis: self.views.get(axis) for axis, shown in self.show_mirror.items() if shown}
+
+    def rotate_circle(self, event, direction):
+        """Rotate the circle by a fixed angle in the given direction (clockwise or counterclockwise)."""
+        # The recorded points stay put, so the chords under them change with the labels
+        self.circle.rotate_circle(direction)
+        self.update_textbox()  # Update the chords listed for the recorded points
+
+        if not self.can_animate or self.rotation_duration <= 0:
+            self.sweep = None
+            self.draw_circle()  # Jump straight to the new positions
+            return
+        self.label_sprites.prepare()
+        # The animation frames only blit the circle's axes: show the new text first
+        self.refresh()
+        # Sweep from wherever the labels are drawn now, the short way round
+        delta = (self.circle.angles - self.label_angles + np.pi) % (2 * np.pi) - np.pi
+        self.sweep = (time.perf_counter(), self.label_angles.copy(), delta)
+        self.start_animation()
+
+    def toggle_playback(self, event):
+        """Starts or stops stepping through the progression, highlighting each chord in time."""
+        if self.playback is not None:
+            self.stop_playback()
+            self.refresh()
+            return
+        if not len(self.progression):
+            print("Nothing to play.")
+            return
+        if not self.can_animate:
+            print("Playback needs an interactive matplotlib backend.")
+            return
+        self.playback = time.perf_counter()
+        self.btn_play.label.set_text('Stop')
+        self.start_animation()
+
+    def stop_playback(self):
+        self.playback = None
+        self.played_chord = None
+        self.playhead.set_data([], [])
+        for i, label in enumerate(self.label_artists):
+            label.get_bbox_patch().set_facecolor(self.label_color(i))
+        self.btn_play.label.set_text('Play')
+        self.fig.canvas.draw_idle()  # For the button label
+
+    def start_animation(self):
+        """Runs the animation timer until the sweep and the playback are both over."""
+        if self.animation is None:
+            # One FuncAnimation for the app's lifetime, paused whenever there is nothing to animate
+            self.animation = FuncAnimation(self.fig, self.animation_frame, frames=itertools.count(),
+                                           init_func=lambda: self.label_artists, interval=1000 / self.frame_rate,
+                                           blit=True, cache_frame_data=False)
+        else:
+            self.animation.event_source.start()
+
+    def animation_frame(self, frame):
+        """Advances the sweep and the playback to the current time and paints the lines.
+
+        Returns the labels, which the animation draws on top and blits: as
+        cached sprites while they change, the real labels in the final frame.
+        Progress is measured in wall time, so a late frame never slows the
+        motion down.
+        """
+        now = time.perf_counter()
+        circle = self.circle
+        if self.sweep is not None:
+            sweep_start, angles, delta = self.sweep
+            t = min(1.0, (now - sweep_start) / self.rotation_duration)
+            if t < 1:
+                t = t * t * (3 - 2 * t)  # Ease in and out
+                self.label_angles = angles + delta * t
+                x = circle.center[0] + circle.radius * np.cos(self.label_angles)
+                y = circle.center[1] + circle.radius * np.sin(self.label_angles)
+                for label, xy in zip(self.label_artists, zip(x, y)):
+                    label.set_position(xy)
+                self.update_overlay()
+            else:
+                self.sweep = None
+                self.place_labels()
+
+        if self.playback is not None:
+            index = int((now - self.playback) * self.playback_tempo / 60)
+            positions = self.progression.positions
+            if index >= len(positions):
+                self.stop_playback()
+            else:
+                chord = int(circle.chord_table[positions[index]])
+                if chord != self.played_chord:
+                    previous, self.played_chord = self.played_chord, chord
+                    for i in (previous, chord):
+                        if i is not None:
+                            self.label_artists[i].get_bbox_patch().set_facecolor(self.label_color(i))
+                self.playhead.set_data([circle.grid_x[positions[index]]], [circle.grid_y[positions[index]]])
+
+        last = self.sweep is None and self.playback is None
+        if last:
+            self.animation.event_source.stop()  # Until the next animation
+        if self.background is not None:
+            self.fig.canvas.restore_region(self.background)
+        self.paint_lines()
+        return self.label_artists if last else [self.label_sprites]
+
+    def mirror_shape(self, event, axis):
+        """Generates and displays the version of the recorded shape mirrored across the given axis."""
+        self.show_mirror[axis] = not self.show_mirror[axis]  # Toggle mirror display
+
+        self.update_textbox()  # Update the textbox after transformation
+        self.draw_circle()
+
+    def on_click(self, event):
+        """Handles the click event to snap to the nearest chord and record it."""
+        if event.inaxes != self.ax:  # If the click is outside the main circle area, do nothing
+            return
+
+        if not self.is_recording:
+            return  # Do nothing if not recording
+
+        # Find the closest predefined point (snap to nearest chord) on the circle,
+        # if within 20% of the radius
+        position = self.circle.snap(event.xdata, event.ydata, self.circle.radius * 0.2)
+        if position is None:
+            return  # Ignore clicks that are too far from any chord
+
+        # Add the clicked point and its corresponding chord to the progression
+        self.history.append(position)
+
+        # Redraw the circle after adding the new chord
+        self.update_textbox()
+        self.draw_circle()
+
+    def start_recording(self, event):
+        """Starts recording clicks."""
+        self.is_recording = True
+
+    def stop_recording(self, event):
+        """Stops recording clicks."""
+        self.is_recording = False
+        self.draw_circle()
+
+    def clear_circle(self, event):
+        """Clears all drawn lines, points, and resets the text and chords."""
+        # Clear the points and chords (undoably)
+        self.history.clear()
+
+        # Reset the flags for mirrors
+        self.show_mirror = {axis: False for axis in self.mirror_axes}
+
+        # Reset the textbox to the original state
+        self.set_text(original_text)  # Reset text to original placeholder
+
+        self.draw_circle()  # Redraw the circle after clearing
+
+    def chord_index_at(self, x, y):
+        """Returns the index of the chord label under (x, y), or None if no label is close enough."""
+        circle = self.circle
+        # The angular bucket gives the only candidate, so a single distance check is enough
+        position = circle.position_at(x, y)
+        x_label, y_label = circle.grid_point(position)
+        if np.hypot(x - x_label, y - y_label) < circle.radius * 0.1:  # Within a certain range (radius * 0.1)
+            return int(circle.chord_table[position])
+        return None
+
+    def refresh_labels(self, indices):
+        """Repaints only the given chord labels (and whatever overlaps them) on top of the lines."""
+        canvas = self.fig.canvas
+        if self.line_layer is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+        renderer = canvas.get_renderer()
+        height = canvas.figure.bbox.height
+        x_min, y_min, x_max, y_max = self.line_layer.get_extents()
+
+        for i in indices:
+            box = self.label_artists[i].get_bbox_patch().get_window_extent(renderer)
+            # Pad and snap to whole pixels so the label's antialiased edge is included,
+            # and clamp to the cached region (whose extents use a top-down y axis)
+            box = Bbox.from_extents(max(np.floor(box.x0) - 2, x_min), max(np.floor(box.y0) - 2, height - y_max),
+                                    min(np.ceil(box.x1) + 2, x_max), min(np.ceil(box.y1) + 2, height - y_min))
+            # Restore the lines under the label only (the restored extents are inclusive)
+            canvas.restore_region(self.line_layer,
+                                  bbox=(box.x0, height - box.y1, box.x1 - 1, height - box.y0 - 1),
+                                  xy=(x_min, y_min))
+            # Neighbours whose edges reach into the restored area are redrawn clipped to it
+            for label in self.label_artists:
+                if label.get_bbox_patch().get_window_extent(renderer).padded(2).overlaps(box):
+                    clip_box = label.get_clip_box()
+                    label.set_clip_box(box)
+                    label.set_clip_on(True)
+                    self.ax.draw_artist(label)
+                    label.set_clip_on(False)
+                    label.set_clip_box(clip_box)
+            canvas.blit(box)
+
+    def set_highlight(self, index):
+        """Moves the hover highlight to the given chord, repainting just the two affected labels."""
+        previous, self.highlighted_chord = self.highlighted_chord, index
+        changed = [i for i in (previous, index) if i is not None]
+        for i in changed:
+            self.label_artists[i].get_bbox_patch().set_facecolor(self.label_color(i))
+        self.refresh_labels(changed)
+        self.last_hover_paint = time.perf_counter()
+        self.hover_stats["performed"] += 1
+
+    def flush_hover(self):
+        """Applies the hover target that the rate limiter held back, if it is still a change."""
+        target, self.pending_highlight = self.pending_highlight, None
+        if target is not None:
+            target = target[0]
+            if target != self.highlighted_chord:
+                self.set_highlight(target)
+
+    def on_mouse_move(self, event):
+        """Handles mouse hover event to highlight the chord label."""
+        if event.inaxes != self.ax:
+            return
+
+        target = self.chord_index_at(event.xdata, event.ydata)
+        if self.pending_highlight is None and target == self.highlighted_chord:
+            self.hover_stats["suppressed"] += 1  # Nothing changed, nothing to repaint
+            return
+
+        wait = self.last_hover_paint + 1 / self.hover_max_rate - time.perf_counter()
+        if wait <= 0:
+            self.pending_highlight = None  # This event supersedes anything still pending
+            if target != self.highlighted_chord:
+                self.set_highlight(target)
+            else:
+                self.hover_stats["suppressed"] += 1
+            return
+
+        # Too soon after the last repaint: keep only the latest target and flush it later
+        self.hover_stats["coalesced"] += 1
+        pending = self.pending_highlight is not None
+        self.pending_highlight = (target,)  # Wrapped so that "no label" (None) can be pending too
+        if not pending:
+            self.hover_timer = self.fig.canvas.new_timer(interval=max(1, int(wait * 1000)))
+            self.hover_timer.single_shot = True
+            self.hover_timer.add_callback(self.flush_hover)
+            self.hover_timer.start()
+
+    def undo_last_point(self, event):
+        """Undoes the last edit (added point, drag or clear)."""
+        if self.history.undo():
+            self.update_textbox()  # Update the text after undo
+            self.draw_circle()  # Redraw the circle after removal
+        else:
+            print("Nothing to undo.")  # Optional: Print feedback if there's nothing to undo
+
+    def redo_last_edit(self, event):
+        """Re-applies the last undone edit."""
+        if self.history.redo():
+            self.update_textbox()
+            self.draw_circle()
+        else:
+            print("Nothing to redo.")
+
+    def save_session(self, path=None):
+        """Saves the progression (as chord indices), the rotation and the shown mirrors."""
+        chord_indices = self.progression.chord_indices
+        write_corpus(path or self.session_path, chord_indices, [0, len(chord_indices)], self.circle.layout,
+                     self.circle.rotation, [axis for axis, shown in self.show_mirror.items() if shown])
+
+    def load_session(self, path=None):
+        """Replaces the progression, rotation and shown mirrors with a saved session's.
+
+        Loading starts a new undo history.
+        """
+        path = path or self.session_path
+        session = read_corpus(path, mmap=False)
+        circle = self.circle
+        if session.layout.labels != circle.layout.labels:
+            raise ValueError(f"{path}: session uses the {session.layout.name!r} layout, "
+                             f"not {circle.layout.name!r}")
+        circle.set_rotation(session.rotation)
+        progression = self.progression
+        progression.clear()
+        for position in circle.label_positions[session[0] if len(session) else []]:
+            progression.append(position)
+        self.history = History(progression, max_edits=self.history_size)
+        self.show_mirror = {axis: axis in session.mirrors for axis in self.mirror_axes}
+        self.update_textbox()
+        self.draw_circle()
+
+    def on_save_session(self, event):
+        self.save_session()
+        print(f"Session saved to {self.session_path}")
+
+    def on_load_session(self, event):
+        try:
+            self.load_session()
+        except FileNotFoundError:
+            print(f"No saved session at {self.session_path}")
+        except ValueError as exc:
+            print(exc)
+
+    def enter_drag_mode(self, event):
+        """Toggle the dragging mode for moving points and highlight the button."""
+        self.is_dragging = not self.is_dragging  # Toggle dragging mode
+
+        if self.is_dragging:
+            self.btn_drag_mode.color = 'lightgreen'  # Highlight the button with light green when drag mode is enabled
+            print("Drag Mode: Enabled")
+        else:
+            self.btn_drag_mode.color = 'lightgray'  # Reset to light gray when drag mode is disabled
+            print("Drag Mode: Disabled")
+
+        self.btn_drag_mode.hovercolor = 'lightgreen' if self.is_dragging else 'lightgray'  # Update hover color as well
+        self.fig.canvas.draw_idle()  # Force the canvas to update
+
+    def on_drag(self, event):
+        """Handles dragging a point and snapping it to the nearest chord on the circle."""
+        if not self.is_dragging or self.dragged_point_index is None:
+            return  # Do nothing if not in drag mode or no point is selected
+        if event.inaxes != self.ax:
+            return
+
+        # Snap the point to the nearest predefined chord (by angle)
+        position = self.circle.position_at(event.xdata, event.ydata)
+        if not self.history.move(self.dragged_point_index, position):
+            return  # Still on the same position: nothing to redraw
+
+        # Redraw the circle after the snap
+        self.update_textbox()
+        self.draw_circle()
+
+    def on_mouse_click(self, event):
+        """Handles mouse click events for selecting the point to drag."""
+        if not self.is_dragging:
+            return  # Do nothing if not in dragging mode
+
+        # Identify the nearest point to the click position and set it as the dragged point
+        x_click, y_click = event.xdata, event.ydata
+        self.dragged_point_index = None
+        self.history.break_group()  # Each drag is its own undo step
+        if x_click is None:
+            return
+
+        # Look the click up in the progression's vertex index (within radius * 0.1)
+        self.dragged_point_index = self.progression.vertex_at(x_click, y_click, self.circle.radius * 0.1,
+                                                              self.drag_pick)
@@ -0,0 +1,432 @@
+"""Headless chord geometry for the extended circle of fifths.
+
+Everything in here is plain NumPy: the mirror and rotate logic can be used from
+batch jobs or servers without importing matplotlib or opening a window.
+"""
+import bisect
+
+import numpy as np
+
+# Chords in custom order (starting from the top, moving clockwise)
+chords = [
+    "A", "F#m", "D", "Bm", "G", "Em", "C", "Am", "F", "Dm", "Bb", "Gm",
+    "Eb", "Cm", "Ab", "Fm", "Db", "Bbm", "F#/Gb", "Ebm", "B", "G#m", "E", "C#m"
+]
+
+
+# Angle of each mirror axis as a fraction of a full turn
+mirror_axis_turns = {
+    "horizontal": 0,
+    "vertical": 1 / 4,
+    "diagonal": 1 / 8,
+    "diagonal_neg": 3 / 8,
+}
+
+
+def index_dtype(num_points):
+    """Returns the smallest unsigned integer dtype that holds every index on a circle of num_points."""
+    return np.min_scalar_type(num_points - 1)
+
+
+def reflection_table(num_points, axis, axes=None):
+    """Permutation table mapping each position to its mirror image across the named axis.
+
+    Position i sits at angle i * 360 / num_points; reflecting across an axis at angle
+    phi sends it to 2 * phi - angle, which must again be a whole position. axes maps
+    axis names to turns and defaults to mirror_axis_turns.
+    """
+    turns = (axes if axes is not None else mirror_axis_turns)[axis]
+    if not _maps_points(num_points, turns):
+        raise ValueError(f"Axis {axis!r} does not map the {num_points} points onto each other")
+    offset = 2 * turns * num_points
+    return ((round(offset) - np.arange(num_points)) % num_points).astype(index_dtype(num_points))
+
+
+def _maps_points(num_points, turns):
+    offset = 2 * turns * num_points
+    return abs(offset - round(offset)) <= 1e-9
+
+
+def fitting_axes(num_points, axes=None):
+    """The mirror axes (of mirror_axis_turns by default) that map num_points points onto each other."""
+    axes = axes if axes is not None else mirror_axis_turns
+    return {axis: turns for axis, turns in axes.items() if _maps_points(num_points, turns)}
+
+
+def rotation_table(num_points, steps):
+    """Permutation table giving the chord under each position after turning the labels.
+
+    Turning the labels one step counterclockwise (like rotate_circle) leaves the
+    previous chord under every position; negative steps turn clockwise.
+    """
+    return ((np.arange(num_points) - steps) % num_points).astype(index_dtype(num_points))
+
+
+def compose(*tables):
+    """Combines permutation tables, applied first to last, into a single table."""
+    result = tables[0]
+    for table in tables[1:]:
+        result = table[result]
+    return result
+
+
+def label_lookup(labels):
+    """Builds the name -> index dict of a list of labels.
+
+    Slash names such as "F#/Gb" are also reachable by either spelling.
+    """
+    lookup = {}
+    for index, name in enumerate(labels):
+        for alias in name.split("/"):
+            lookup.setdefault(alias, index)
+        lookup[name] = index
+    return lookup
+
+
+class Layout:
+    """A circle layout: its ordered labels (clockwise from the top), symmetry axes and title.
+
+    Everything derived from them is computed once here and shared read-only by
+    every CircleModel and batch transform using the layout: the grid angles and
+    unit-circle coordinates, the mirror tables, the rotation table for every
+    number of steps and the label -> index map.
+    """
+
+    def __init__(self, name, labels, axes=None, title=None):
+        self.name = name
+        self.title = title or name  # Shown above the circle
+        self.labels = tuple(labels)
+        self.num_points = n = len(self.labels)
+        self.axes = dict(axes if axes is not None else mirror_axis_turns)  # Axis name -> turns
+        self.dtype = index_dtype(n)
+        self.angle_step = 2 * np.pi / n
+        self.angles = np.arange(n) * self.angle_step  # Angle of every grid position
+        self.unit_x = np.cos(self.angles)
+        self.unit_y = np.sin(self.angles)
+        self.mirror_tables = {axis: reflection_table(n, axis, self.axes) for axis in self.axes}
+        # Row s is rotation_table(n, s), so any rotation is a row lookup
+        self.rotation_tables = np.stack([rotation_table(n, steps) for steps in range(n)])
+        self.lookup = label_lookup(self.labels)
+        for array in (self.angles, self.unit_x, self.unit_y, self.rotation_tables, *self.mirror_tables.values()):
+            array.setflags(write=False)
+
+    def __repr__(self):
+        return f"Layout({self.name!r}, {self.num_points} points)"
+
+    def rotation(self, steps):
+        """rotation_table(num_points, steps), without recomputing it."""
+        return self.rotation_tables[steps % self.num_points]
+
+
+def subdivided_labels(labels, divisions):
+    """Labels for a circle with divisions points per step of labels (microtonal layouts).
+
+    The points between two labels are named by the fraction of a step past the
+    previous one, e.g. "A+1:2"; both spellings of a slash name get it, as in
+    "F#+1:2/Gb+1:2", so label_lookup aliases them like the plain labels.
+    """
+    return [label if k == 0 else "/".join(f"{name}+{k}:{divisions}" for name in label.split("/"))
+            for label in labels for k in range(divisions)]
+
+
+# Registered layouts by name; the "extended" circle is the default
+layouts = {}
+_size_layouts = {}  # Unlabelled layouts by number of points, for get_layout(num_points)
+
+
+def register_layout(name, labels, axes=None, title=None):
+    """Adds a layout to the registry (replacing one with the same name) and returns it."""
+    layouts[name] = layout = Layout(name, labels, axes, title)
+    return layout
+
+
+def get_layout(layout="extended"):
+    """Resolves a layout given by name, as a Layout, as a list of labels or as a number of points."""
+    if isinstance(layout, Layout):
+        return layout
+    if isinstance(layout, str):
+        if layout not in layouts:
+            raise ValueError(f"Unknown layout: {layout!r} (known: {', '.join(layouts)})")
+        return layouts[layout]
+    if isinstance(layout, (int, np.integer)):
+        num_points = int(layout)
+        if num_points == len(chords):
+            return layouts["extended"]
+        if num_points not in _size_layouts:
+            _size_layouts[num_points] = Layout(f"{num_points} points", [str(i) for i in range(num_points)],
+                                               fitting_axes(num_points))
+        return _size_layouts[num_points]
+    layout = list(layout)
+    return Layout("custom", layout, fitting_axes(len(layout)))
+
+
+# Leading-tone diminished chord of each major chord in chords
+_diminished = ["G#dim", "C#dim", "F#dim", "Bdim", "Edim", "Adim", "Ddim", "Gdim", "Cdim", "Fdim", "A#dim", "D#dim"]
+
+register_layout("extended", chords, title="Extended Circle of Fifths")  # Majors and their relative minors
+register_layout("twelve", chords[::2], title="Circle of Fifths")  # The plain circle of twelve major keys
+register_layout("diminished", [name for major, minor, dim in zip(chords[::2], chords[1::2], _diminished)
+                               for name in (major, minor, dim)],
+                title="Circle of Fifths with Diminished Chords")
+register_layout("microtonal_48", subdivided_labels(chords, 2), title="Microtonal Circle of Fifths (48 points)")
+register_layout("microtonal_72", subdivided_labels(chords, 3), title="Microtonal Circle of Fifths (72 points)")
+
+
+class CircleModel:
+    """The chord labels' positions on the circle, including the current rotation.
+
+    Recorded chords are kept as integer positions on the fixed grid of
+    num_points equally spaced points; position p has chord (p - rotation) % num_points
+    under it. Mirrors and rotations are permutation tables precomputed once per
+    layout, so transforming a progression is a single NumPy gather without any
+    trigonometry.
+    """
+
+    def __init__(self, layout="extended", radius=20, center=(0, 0)):
+        self.layout = layout = get_layout(layout)
+        self.chords = list(layout.labels)
+        self.num_points = layout.num_points
+        self.radius = radius
+        self.center = center
+        self.rotation = 0  # Steps the labels are turned counterclockwise
+        self.angle_step = layout.angle_step
+        # Coordinates of the fixed grid positions (equally spaced around the circle)
+        self.grid_x = center[0] + radius * layout.unit_x
+        self.grid_y = center[1] + radius * layout.unit_y
+        self.mirror_tables = layout.mirror_tables
+        self.compute_points()
+
+    def compute_points(self):
+        """Looks up the label angles and coordinates for the current rotation."""
+        layout = self.layout
+        self.chord_table = layout.rotation(self.rotation)  # Position -> chord under it
+        self.label_positions = layout.rotation(-self.rotation)  # Chord -> its position
+        self.angles = layout.angles[self.label_positions]
+        self.x_points = self.grid_x[self.label_positions]
+        self.y_points = self.grid_y[self.label_positions]
+
+    def point(self, index):
+        """Returns the (x, y) position of the chord label with the given index."""
+        return self.x_points[index], self.y_points[index]
+
+    def grid_point(self, position):
+        """Returns the (x, y) coordinates of a grid position."""
+        return self.grid_x[position], self.grid_y[position]
+
+    def position_at(self, x, y):
+        """Given a point (x, y), return the grid position closest to it by angle."""
+        angle = np.arctan2(y - self.center[1], x - self.center[0])
+        # Rounding the angle in steps is circular, so angles just below 2 * pi wrap to 0
+        return int(round(angle / self.angle_step)) % self.num_points
+
+    def get_chord_index(self, x, y):
+        """Given a point (x, y), return the index of the chord closest to it by angle."""
+        return int(self.chord_table[self.position_at(x, y)])
+
+    def get_chord_from_point(self, x, y):
+        """Given a point (x, y), return the corresponding chord based on its position."""
+        return self.chords[self.get_chord_index(x, y)]
+
+    def snap(self, x, y, threshold):
+        """Returns the grid position nearest to (x, y), or None if it is further than threshold."""
+        # On a circle the nearest of the equally spaced points is also the nearest by angle
+        position = self.position_at(x, y)
+        if np.hypot(self.grid_x[position] - x, self.grid_y[position] - y) > threshold:
+            return None
+        return position
+
+    def rotate_circle(self, direction):
+        """Rotates the labels by one step (15 degrees), "clockwise" or "counterclockwise"."""
+        self.rotation += -1 if direction == "clockwise" else 1
+        self.rotation %= self.num_points
+        self.compute_points()
+
+    def set_rotation(self, steps):
+        """Turns the labels the given number of steps counterclockwise from their starting place."""
+        self.rotation = int(steps) % self.num_points
+        self.compute_points()
+
+
+class VertexIndex:
+    """The progression's vertex indices bucketed by grid position, for O(1) hit-testing.
+
+    Each bucket is kept sorted, so the earliest and the most recent vertex on a
+    position are its first and last entries. Appending and popping the last
+    vertex are O(1); moving one vertex is a bisect in each of the two buckets.
+    """
+
+    # How vertex_at() chooses among vertices sharing a position
+    picks = ("earliest", "most_recent")
+
+    def __init__(self, num_points):
+        self.buckets = [[] for _ in range(num_points)]
+
+    def add(self, index, position):
+        """Adds a vertex; appending the newest vertex keeps its bucket sorted for free."""
+        bucket = self.buckets[position]
+        if not bucket or bucket[-1] < index:
+            bucket.append(index)
+        else:
+            bisect.insort(bucket, index)
+
+    def remove(self, index, position):
+        bucket = self.buckets[position]
+        if bucket[-1] == index:
+            bucket.pop()  # The common case: undoing the newest vertex
+        else:
+            del bucket[bisect.bisect_left(bucket, index)]
+
+    def move(self, index, old_position, new_position):
+        if old_position != new_position:
+            self.remove(index, old_position)
+            self.add(index, new_position)
+
+    def pick(self, position, pick="most_recent"):
+        """Returns the earliest or most recent vertex on a position, or None if it has none."""
+        bucket = self.buckets[position]
+        if not bucket:
+            return None
+        if pick not in self.picks:
+            raise ValueError(f"Unknown pick: {pick!r}")
+        return bucket[-1] if pick == "most_recent" else bucket[0]
+
+
+class Progression:
+    """A recorded chord progression, stored as integer grid positions on the circle."""
+
+    def __init__(self, circle):
+        self.circle = circle
+        self.positions = []  # Grid position of every recorded chord
+        self.vertex_index = VertexIndex(circle.num_points)
+        # Transformed copies of positions kept in step with every edit: key -> (table, positions)
+        self.views = {}
+        self.version = 0  # Bumped by every edit, so derived data can tell when it is stale
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def indices(self):
+        """The recorded grid positions as an integer array."""
+        return np.array(self.positions, dtype=index_dtype(self.circle.num_points))
+
+    @property
+    def points(self):
+        """(x, y) of every recorded chord."""
+        circle = self.circle
+        return [circle.grid_point(position) for position in self.positions]
+
+    @property
+    def chord_indices(self):
+        """Index of the chord currently under every recorded position."""
+        return self.circle.chord_table[self.indices]
+
+    @property
+    def chords(self):
+        """Names of the chords currently under the recorded positions."""
+        names = self.circle.chords
+        return [names[i] for i in self.chord_indices]
+
+    def append(self, position):
+        """Records the chord under the given grid position."""
+        position = int(position)
+        self.version += 1
+        self.vertex_index.add(len(self.positions), position)
+        self.positions.append(position)
+        for table, positions in self.views.values():
+            positions.append(table[position])
+
+    def move(self, index, position):
+        """Moves the recorded chord at the given index onto another grid position."""
+        position = int(position)
+        self.version += 1
+        self.vertex_index.move(index, self.positions[index], position)
+        self.positions[index] = position
+        for table, positions in self.views.values():
+            positions[index] = table[position]
+
+    def pop(self):
+        """Removes the last recorded chord."""
+        self.version += 1
+        self.vertex_index.remove(len(self.positions) - 1, self.positions.pop())
+        for _, positions in self.views.values():
+            positions.pop()
+
+    def clear(self):
+        """Removes all recorded chords."""
+        self.version += 1
+        self.positions = []
+        self.vertex_index = VertexIndex(self.circle.num_points)
+        for _, positions in self.views.values():
+            positions.clear()
+
+    def track(self, key, table):
+        """Starts keeping the positions mapped through a permutation table (e.g. a mirror).
+
+        The view is computed once here; afterwards every edit updates it in O(1).
+        """
+        table = [int(p) for p in table]  # List lookups are cheaper than NumPy scalars
+        self.views[key] = (table, [table[p] for p in self.positions])
+
+    def untrack(self, key):
+        """Stops keeping the view with the given key (if it is kept)."""
+        self.views.pop(key, None)
+
+    def view(self, key):
+        """The tracked positions for key, as a list that the next edit will update."""
+        return self.views[key][1]
+
+    def vertex_at(self, x, y, threshold, pick="most_recent"):
+        """Returns the index of the recorded chord at (x, y), or None if none is within threshold.
+
+        Vertices sit on grid positions, so the nearest one is found from the angle
+        alone; when several share that position, pick chooses the "earliest" or
+        the "most_recent" of them.
+        """
+        position = self.circle.snap(x, y, threshold)
+        if position is None:
+            return None
+        return self.vertex_index.pick(position, pick)
+
+    def mirrored(self, axis):
+        """Returns the points and chords of the progression mirrored across the named axis."""
+        circle = self.circle
+        positions = circle.mirror_tables[axis][self.indices]
+        # Mirroring and reading off the chords is one gather through the composed table
+        chord_indices = compose(circle.mirror_tables[axis], circle.chord_table)[self.indices]
+        points = [circle.grid_point(position) for position in positions]
+        return points, [circle.chords[i] for i in chord_indices]
+
+
+class ViewCache:
+    """Memoized transformed views of a progression, keyed by (progression version, transform).
+
+    get() returns a read-only position array per transform key and recomputes it
+    only after the progression has been edited, so showing or hiding a view,
+    rotating the labels or repainting costs no recomputation. Keys tracked by
+    the progression are read off its incremental view; others go through a
+    table gather.
+    """
+
+    def __init__(self, progression):
+        self.progression = progression
+        self.entries = {}  # Transform key -> (progression version, positions); one version per key
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, table=None):
+        """The positions of the progression under the transform key (table if it is not tracked)."""
+        progression = self.progression
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == progression.version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        dtype = index_dtype(progression.circle.num_points)
+        if key in progression.views:
+            positions = np.array(progression.view(key), dtype=dtype)
+        else:
+            positions = np.asarray(table, dtype=dtype)[progression.indices]
+        positions.setflags(write=False)
+        self.entries[key] = (progression.version, positions)
+        return positions
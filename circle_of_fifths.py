@@ -1,515 +1,302 @@
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Button
-
-# Chords in custom order (starting from the top, moving clockwise)
-chords = [
-    "A", "F#m", "D", "Bm", "G", "Em", "C", "Am", "F", "Dm", "Bb", "Gm",
-    "Eb", "Cm", "Ab", "Fm", "Db", "Bbm", "F#/Gb", "Ebm", "B", "G#m", "E", "C#m"
-]
-
-# Number of points now should be 25 (for 25 chords)
-num_points = len(chords)
-
-# Circle radius and center
-radius = 20
-center = (0, 0)
-
-# Create angles for the 25 points (equally spaced around the circle)
-angles = np.linspace(0, 2 * np.pi, num_points, endpoint=False)
-
-fig, ax = plt.subplots(figsize=(10, 7))
-plt.subplots_adjust(bottom=0.15, right=0.8)  # Adjust space for the textbox
-
-# Textbox for displaying chords
-textbox_ax = fig.add_axes([0.85, 0.2, 0, 6])  # Position for textbox
-textbox_ax.axis("off")  # Hide the axes
-
-# Initialize textbox with placeholder text
-textbox = textbox_ax.text(0.1, 0.1, "Selected Chords\n will be displayed here",
-                          horizontalalignment='center', verticalalignment='center',
-                          fontsize=12, color='black')
-original_text = "Selected Chords\n will be displayed here"
-
-# To store the names of the clicked chords
-clicked_chords = []
-mirrored_chords = []
-
-# To store the points clicked by the user
-clicked_points = []
-mirrored_points = []
-is_recording = False  # Track whether the recording is active or not
-show_mirror = False  # Track whether to show the mirrored shape
-show_mirror_vertical = False  # Track whether to show vertical mirror
-show_mirror_diagonal = False  # Track whether to show diagonal mirror
-show_mirror_diagonal_neg = False  # Track whether to show diagonal mirror for y=-x axis
-
-highlighted_chord = None  # Track the currently highlighted chord
-
-# Compute points once so they can be reused
-def compute_points():
-    global x_points, y_points
-    x_points = center[0] + radius * np.cos(angles)
-    y_points = center[1] + radius * np.sin(angles)
-
-
-# Modify update_textbox to ensure it updates properly
-def update_textbox():
-    """Updates the textbox with the clicked and transformed chords."""
-    selected_chords_text = f"Selected Chords:\n{', '.join(clicked_chords)}" if clicked_chords else "No chords selected."
-    transformed_chords_text = f"Transformed Chords:\n{', '.join(mirrored_chords)}" if mirrored_chords else "No transformation applied."
-
-    textbox.set_text(f"{selected_chords_text}\n\n{transformed_chords_text}")
-    fig.canvas.draw_idle()
-
-def draw_circle():
-    """Draws the circle and places the chords in the correct positions."""
-    ax.clear()  # Clear any previous drawings
-    ax.set_xlim(-radius - 2, radius + 2)
-    ax.set_ylim(-radius - 2, radius + 2)
-    ax.set_aspect('equal')
-    ax.set_xticks([])  # Hide x ticks
-    ax.set_yticks([])  # Hide y ticks
-    ax.set_title("Extended Circle of Fifths", fontsize=30)
-
-    # Draw circle
-    circle = plt.Circle(center, radius, color='gray', fill=False, linewidth=4)
-    ax.add_patch(circle)
-
-    # Plot the chords at each point with optional highlight
-    for i, (x, y) in enumerate(zip(x_points, y_points)):
-        chord_label = chords[i]
-        highlight = (highlighted_chord == i)
-
-        # Highlight the chord label if mouse hovers over it
-        ax.text(x, y, chord_label, fontsize=12, ha='center', va='center',
-                bbox=dict(facecolor='yellow' if highlight else 'white', edgecolor='black', boxstyle='round,pad=0.3'))
-
-    # Draw the lines between clicked points
-    if len(clicked_points) > 1:
-        for i in range(1, len(clicked_points)):
-            x1, y1 = clicked_points[i - 1]
-            x2, y2 = clicked_points[i]
-            ax.plot([x1, x2], [y1, y2], 'k-', lw=2)
-
-    # Draw mirrored shape if enabled
-    if show_mirror and len(mirrored_points) > 1:
-        for i in range(1, len(mirrored_points)):
-            x1, y1 = mirrored_points[i - 1]
-            x2, y2 = mirrored_points[i]
-            ax.plot([x1, x2], [y1, y2], 'r--', lw=3)  # Green dashed for mirror
-
-    # Draw vertical mirrored shape if enabled
-    if show_mirror_vertical and len(mirrored_points) > 1:
-        for i in range(1, len(mirrored_points)):
-            x1, y1 = mirrored_points[i - 1]
-            x2, y2 = mirrored_points[i]
-            ax.plot([x1, x2], [y1, y2], 'b--.', lw=3)  # Blue dash-dot for vertical mirror
-
-    # Draw diagonal mirrored shape if enabled
-    if show_mirror_diagonal and len(mirrored_points) > 1:
-        for i in range(1, len(mirrored_points)):
-            x1, y1 = mirrored_points[i - 1]
-            x2, y2 = mirrored_points[i]
-            ax.plot([x1, x2], [y1, y2], 'y--', lw=3)  # Yellow dotted for diagonal mirror
-
-    # Draw diagonal mirrored shape for y = -x axis if enabled
-    if show_mirror_diagonal_neg and len(mirrored_points) > 1:
-        for i in range(1, len(mirrored_points)):
-            x1, y1 = mirrored_points[i - 1]
-            x2, y2 = mirrored_points[i]
-            ax.plot([x1, x2], [y1, y2], 'm--', lw=3)  # Magenta line for y=-x diagonal mirror
-
-    # Force the canvas to update
-    fig.canvas.draw_idle()
-
-
-def rotate_circle(event, direction):
-    """Rotate the circle by a fixed angle in the given direction (clockwise or counterclockwise)."""
-    global angles, x_points, y_points, clicked_chords, mirrored_points, mirrored_chords
-
-    rotation_angle = np.radians(15)  # 15-degree step
-    if direction == "clockwise":
-        rotation_angle *= -1  # Negative for clockwise rotation
-
-    angles = (angles + rotation_angle) % (2 * np.pi)  # Rotate angles
-    compute_points()  # Recalculate points after rotation
-
-    # Update clicked chords after rotation
-    rotated_chords = []
-    for point in clicked_points:
-        x_point, y_point = point
-        angle = np.arctan2(y_point - center[1], x_point - center[0])
-        if angle < 0:
-            angle += 2 * np.pi  # Normalize angle
-        closest_point_idx = np.argmin(np.abs(angles - angle))
-        rotated_chords.append(chords[closest_point_idx])
-
-    clicked_chords = rotated_chords
-
-    update_textbox()  # Update displayed chords
-    draw_circle()  # Redraw with updated positions
-
-    # Recalculate mirrored points and chords based on the updated clicked points
-    mirrored_points = []
-    mirrored_chords = []
-
-    if show_mirror:
-        mirrored_points = [(x, -y) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    if show_mirror_vertical:
-        mirrored_points = [(-x, y) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    if show_mirror_diagonal:
-        mirrored_points = [(y, x) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    if show_mirror_diagonal_neg:
-        mirrored_points = [(-y, -x) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    update_textbox()  # Update the textbox with the transformed chords after rotation
-    draw_circle()  # Redraw the circle with updated positions
-
-
-def mirror_shape(event):
-    """Generates and displays the mirrored version of the recorded shape (horizontal axis)."""
-    global mirrored_points, show_mirror, mirrored_chords
-    show_mirror = not show_mirror  # Toggle mirror display
-
-    if show_mirror:
-        # Reflect over horizontal axis and find the new chords
-        mirrored_points = [(x, -y) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]  # Map to new chords
-    else:
-        mirrored_points = []
-        mirrored_chords = []  # Clear mirrored chords when hiding mirror
-
-    update_textbox()  # Update the textbox after transformation
-    draw_circle()
-
-def mirror_shape_vertically(event):
-    """Generates and displays the vertically mirrored version of the recorded shape."""
-    global mirrored_points, show_mirror_vertical, mirrored_chords
-    show_mirror_vertical = not show_mirror_vertical  # Toggle vertical mirror display
-
-    if show_mirror_vertical:
-        # Reflect over vertical axis and find the new chords
-        mirrored_points = [(-x, y) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]  # Map to new chords
-    else:
-        mirrored_points = []
-        mirrored_chords = []  # Clear mirrored chords when hiding mirror
-
-    update_textbox()  # Update the textbox after transformation
-    draw_circle()
-
-def mirror_shape_diagonally(event):
-    """Generates and displays the diagonally mirrored version of the recorded shape."""
-    global mirrored_points, show_mirror_diagonal, mirrored_chords
-    show_mirror_diagonal = not show_mirror_diagonal  # Toggle diagonal mirror display
-
-    if show_mirror_diagonal:
-        # Reflect over diagonal (swap x and y) and find the new chords
-        mirrored_points = [(y, x) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]  # Map to new chords
-    else:
-        mirrored_points = []
-        mirrored_chords = []  # Clear mirrored chords when hiding mirror
-
-    update_textbox()  # Update the textbox after transformation
-    draw_circle()
-
-def mirror_shape_diagonal_neg(event):
-    """Generates and displays the diagonally mirrored version of the recorded shape for y = -x axis."""
-    global mirrored_points, show_mirror_diagonal_neg, mirrored_chords
-    show_mirror_diagonal_neg = not show_mirror_diagonal_neg  # Toggle diagonal mirror for y = -x axis
-
-    if show_mirror_diagonal_neg:
-        # Reflect over y = -x axis (swap and negate) and find the new chords
-        mirrored_points = [(-y, -x) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]  # Map to new chords
-    else:
-        mirrored_points = []
-        mirrored_chords = []  # Clear mirrored chords when hiding mirror
-
-    update_textbox()  # Update the textbox after transformation
-    draw_circle()
-
-def get_chord_from_point(x, y):
-    """Given a point (x, y), return the corresponding chord based on its position."""
-    # Calculate the angle of the point
-    angle = np.arctan2(y - center[1], x - center[0])
-
-    if angle < 0:
-        angle += 2 * np.pi  # Normalize the angle to be positive
-
-    # Find the closest chord based on the angle
-    closest_point_idx = np.argmin(np.abs(angles - angle))
-    return chords[closest_point_idx]
-
-
-def on_click(event):
-    """Handles the click event to snap to the nearest chord and record it."""
-    global is_recording, clicked_chords, mirrored_chords, mirrored_points, dragged_point_index
-
-    if event.inaxes != ax:  # If the click is outside the main circle area, do nothing
-        return
-
-    if not is_recording:
-        return  # Do nothing if not recording
-
-    x_click, y_click = event.xdata, event.ydata
-
-    # Find the closest predefined point (snap to nearest chord) on the circle.
-    distances = [np.sqrt((x - x_click) ** 2 + (y - y_click) ** 2) for x, y in zip(x_points, y_points)]
-    min_distance = min(distances)
-    closest_point_idx = distances.index(min_distance)
-
-    # Define a snapping threshold (adjust as needed)
-    snap_threshold = radius * 0.2  # Snap if within 20% of the radius
-
-    if min_distance > snap_threshold:
-        return  # Ignore clicks that are too far from any chord
-
-    # Get snapped point coordinates (this is the exact chord's position)
-    snapped_x = x_points[closest_point_idx]
-    snapped_y = y_points[closest_point_idx]
-
-    # Add the clicked point and its corresponding chord to the lists
-    clicked_points.append((snapped_x, snapped_y))
-    clicked_chords.append(chords[closest_point_idx])  # Add the chord name to clicked_chords
-
-    # Redraw the circle after adding the new chord
-    update_textbox()
-    draw_circle()
-
-
-def start_recording(event):
-    """Starts recording clicks."""
-    global is_recording
-    is_recording = True
-
-def stop_recording(event):
-    """Stops recording clicks."""
-    global is_recording
-    is_recording = False
-    draw_circle()
-
-def clear_circle(event):
-    """Clears all drawn lines, points, and resets the text and chords."""
-    global clicked_points, mirrored_points, clicked_chords, mirrored_chords
-    global show_mirror, show_mirror_vertical, show_mirror_diagonal, show_mirror_diagonal_neg
-
-    # Clear the points and chords
-    clicked_points = []
-    mirrored_points = []
-    clicked_chords = []
-    mirrored_chords = []
-
-    # Reset the flags for mirrors
-    show_mirror = False
-    show_mirror_vertical = False
-    show_mirror_diagonal = False
-    show_mirror_diagonal_neg = False
-
-    # Reset the textbox to the original state
-    textbox.set_text(original_text)  # Reset text to original placeholder
-
-    draw_circle()  # Redraw the circle after clearing
-
-def on_mouse_move(event):
-    """Handles mouse hover event to highlight the chord label."""
-    global highlighted_chord
-    if event.inaxes == ax:
-        # Calculate which chord is being hovered over
-        x_mouse, y_mouse = event.xdata, event.ydata
-        min_distance = float('inf')
-        highlighted_chord = None
-
-        # Compute the closest chord based on the mouse position
-        for i, (x, y) in enumerate(zip(x_points, y_points)):
-            distance = np.sqrt((x_mouse - x) ** 2 + (y_mouse - y) ** 2)
-            if distance < radius * 0.1:  # If within a certain range (radius * 0.1)
-                highlighted_chord = i
-                break
-
-        draw_circle()
-
-def undo_last_point(event):
-    """Handles undo logic, ensuring no new points are added."""
-    global clicked_points, mirrored_points, clicked_chords, mirrored_chords
-
-    if clicked_points:  # Only remove if there are points
-        # Remove the last clicked point and corresponding chord
-        clicked_points.pop()
-        clicked_chords.pop()
-
-        # Also update mirrored points and chords
-        mirrored_points = [(x, y) for x, y in mirrored_points[:-1]]  # Remove last mirrored point
-        mirrored_chords = mirrored_chords[:-1]  # Remove last mirrored chord
-
-        update_textbox()  # Update the text after undo
-        draw_circle()  # Redraw the circle after removal
-    else:
-        print("No points to undo.")  # Optional: Print feedback if there's nothing to undo
-
-# Create buttons with more centered positions
-ax_start = plt.axes([0.1, 0.02, 0.2, 0.05])
-ax_stop = plt.axes([0.3, 0.02, 0.2, 0.05])
-ax_clear = plt.axes([0.5, 0.02, 0.2, 0.05])
-#ax_rotate = plt.axes([0.7, 0.02, 0.2, 0.05])
-ax_rotate_cw = plt.axes([0.7, 0.02, 0.2, 0.025])
-ax_rotate_ccw = plt.axes([0.7, 0.045, 0.2, 0.025])
-
-ax_mirror = plt.axes([0.1, 0.07, 0.2, 0.05])
-ax_mirror_vertical = plt.axes([0.3, 0.07, 0.2, 0.05])
-ax_mirror_diagonal = plt.axes([0.5, 0.07, 0.2, 0.05])
-ax_mirror_diagonal_neg = plt.axes([0.7, 0.07, 0.2, 0.05])
-
-ax_undo = plt.axes([0.1, 0.8, 0.1, 0.05])
-
-btn_start = Button(ax_start, 'Start Recording')
-btn_stop = Button(ax_stop, 'Stop Recording')
-btn_clear = Button(ax_clear, 'Clear Circle')
-#btn_rotate = Button(ax_rotate, 'Transpose')
-
-
-btn_rotate_cw = Button(ax_rotate_cw, 'Rotate Clockwise')
-btn_rotate_ccw = Button(ax_rotate_ccw, 'Rotate Counterclockwise')
-
-btn_rotate_cw.on_clicked(lambda event: rotate_circle(event, "clockwise"))
-btn_rotate_ccw.on_clicked(lambda event: rotate_circle(event, "counterclockwise"))
-
-
-btn_mirror = Button(ax_mirror, 'Mirror Horizontal')
-btn_mirror_vertical = Button(ax_mirror_vertical, 'Mirror Vertical')
-btn_mirror_diagonal = Button(ax_mirror_diagonal, 'Mirror Diagonal 1')
-btn_mirror_diagonal_neg = Button(ax_mirror_diagonal_neg, 'Mirror Diagonal 2')
-
-btn_undo = Button(ax_undo, 'Undo')
-
-btn_start.on_clicked(start_recording)
-btn_stop.on_clicked(stop_recording)
-btn_clear.on_clicked(clear_circle)
-#btn_rotate.on_clicked(rotate_circle)
-btn_mirror.on_clicked(mirror_shape)
-btn_mirror_vertical.on_clicked(mirror_shape_vertically)
-btn_mirror_diagonal.on_clicked(mirror_shape_diagonally)
-btn_mirror_diagonal_neg.on_clicked(mirror_shape_diagonal_neg)
-# Connect the undo button to the undo handler
-btn_undo.on_clicked(undo_last_point)
-
-# Variables to track dragging mode and the points being dragged
-is_dragging = False
-dragged_point_index = None  # The index of the point being dragged
-
-
-def enter_drag_mode(event):
-    """Toggle the dragging mode for moving points and highlight the button."""
-    global is_dragging
-    is_dragging = not is_dragging  # Toggle dragging mode
-
-    if is_dragging:
-        btn_drag_mode.color = 'lightgreen'  # Highlight the button with light green when drag mode is enabled
-        print("Drag Mode: Enabled")
-    else:
-        btn_drag_mode.color = 'lightgray'  # Reset to light gray when drag mode is disabled
-        print("Drag Mode: Disabled")
-
-    btn_drag_mode.hovercolor = 'lightgreen' if is_dragging else 'lightgray'  # Update hover color as well
-    fig.canvas.draw_idle()  # Force the canvas to update
-
-
-def on_drag(event):
-    """Handles dragging a point and snapping it to the nearest chord on the circle."""
-    global dragged_point_index, clicked_points, clicked_chords, mirrored_points, mirrored_chords
-
-    if not is_dragging or dragged_point_index is None:
-        return  # Do nothing if not in drag mode or no point is selected
-
-    x_drag, y_drag = event.xdata, event.ydata
-    # Calculate the angle of the dragged point relative to the center
-    angle = np.arctan2(y_drag - center[1], x_drag - center[0])
-    if angle < 0:
-        angle += 2 * np.pi  # Normalize the angle to be positive
-
-    # Find the closest predefined chord based on angle
-    nearest_chord_angle = min(angles, key=lambda a: abs(a - angle))
-
-    # Snap the point to the nearest predefined chord (angle)
-    snapped_x = center[0] + radius * np.cos(nearest_chord_angle)
-    snapped_y = center[1] + radius * np.sin(nearest_chord_angle)
-
-    # Update the clicked_points with the snapped position
-    clicked_points[dragged_point_index] = (snapped_x, snapped_y)
-
-    # Find the chord corresponding to the snapped position
-    snapped_chord_index = np.argmin(np.abs(angles - nearest_chord_angle))
-    clicked_chords[dragged_point_index] = chords[snapped_chord_index]
-
-    # Also update the mirrored points based on the new snapped position
-    mirrored_points = []
-    mirrored_chords = []
-
-    if show_mirror:
-        mirrored_points = [(x, -y) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    if show_mirror_vertical:
-        mirrored_points = [(-x, y) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    if show_mirror_diagonal:
-        mirrored_points = [(y, x) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    if show_mirror_diagonal_neg:
-        mirrored_points = [(-y, -x) for x, y in clicked_points]
-        mirrored_chords = [get_chord_from_point(x, y) for x, y in mirrored_points]
-
-    # Redraw the circle after the snap
-    update_textbox()
-    draw_circle()
-
-def on_mouse_click(event):
-    """Handles mouse click events for selecting the point to drag."""
-    global is_dragging, dragged_point_index
-
-    if not is_dragging:
-        return  # Do nothing if not in dragging mode
-
-    # Identify the nearest point to the click position and set it as the dragged point
-    x_click, y_click = event.xdata, event.ydata
-    min_distance = float('inf')
-    dragged_point_index = None
-
-    # Find the closest point to the mouse click
-    for i, (x, y) in enumerate(clicked_points):
-        distance = np.sqrt((x_click - x) ** 2 + (y_click - y) ** 2)
-        if distance < radius * 0.1:  # If within a certain range (radius * 0.1)
-            dragged_point_index = i
-            break
-
-# Add new button for dragging mode
-ax_drag_mode = plt.axes([0.8, 0.15, 0.1, 0.05])
-btn_drag_mode = Button(ax_drag_mode, 'Drag Mode')
-
-btn_drag_mode.on_clicked(enter_drag_mode)
-
-# Compute the points once
-compute_points()
-
-# Draw the initial circle
-draw_circle()
-
-# Connect the drag and mouse click events
-fig.canvas.mpl_connect('button_press_event', on_mouse_click)
-fig.canvas.mpl_connect('motion_notify_event', on_drag)
-
-fig.canvas.mpl_connect('button_press_event', on_click)
-fig.canvas.mpl_connect('motion_notify_event', on_mouse_move)
-
-plt.show()
+"""Extended circle of fifths: run this file to open the interactive visualizer.
+
+Importing it does not start a GUI; the chord geometry is re-exported from the
+headless circle_model module and matplotlib is only imported when the app is
+launched. The "transform" command streams progressions through mirrors and
+rotations without any GUI:
+
+    python circle_of_fifths.py transform -t vertical -t clockwise songs.txt -o out.txt
+
+"render" draws them as PNG or SVG diagrams:
+
+    python circle_of_fifths.py render songs.txt -o diagrams -m vertical
+
+"pack" stores them as a binary corpus file (see corpus_file.py), which
+"render" also reads, "analyze" counts chord frequencies and transitions (see
+analytics.py) and "serve" answers transform requests over local HTTP (see
+transform_service.py).
+"""
+import argparse
+import itertools
+import os
+import sys
+
+from circle_model import CircleModel, Progression, chords, layouts
+
+# The chord geometry re-exported from circle_model
+__all__ = ["CircleModel", "Progression", "chords"]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extended circle of fifths visualizer and tools.")
+    parser.add_argument("--layout", default="extended", choices=sorted(layouts),
+                        help="circle layout: its labels and mirror axes (default: extended)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="record the GUI event handlers and write the profile to PATH on exit "
+                             "(default: $CIRCLE_PROFILE)")
+    parser.add_argument("--profile-format", choices=("json", "chrome"),
+                        help="profile as JSON summaries or Chrome trace events "
+                             "(default: $CIRCLE_PROFILE_FORMAT or json)")
+    parser.add_argument("--transitions", nargs="+", metavar="FILE",
+                        help="overlay the chord frequencies and transitions of these progression files")
+    parser.add_argument("--session", metavar="PATH",
+                        help="session file for the Save/Load Session buttons, loaded at start if it exists "
+                             "(default: session.circ)")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    transform = commands.add_parser(
+        "transform", help="mirror/rotate progressions read from files or stdin",
+        description="Reads one progression per line (chord names separated by commas or spaces), "
+                    "applies the transforms in order and writes one progression per line.")
+    transform.add_argument("inputs", nargs="*", default=["-"], metavar="FILE",
+                           help="input files ('-' or nothing for stdin)")
+    transform.add_argument("-t", "--transform", action="append", default=[], metavar="STEP",
+                           help="horizontal, vertical, diagonal, diagonal_neg, clockwise, counterclockwise "
+                                "or a signed number of counterclockwise steps; repeat or comma-separate "
+                                "to chain")
+    transform.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    transform.add_argument("--batch-size", type=int, default=None,
+                           help="lines processed per batch (bounds memory)")
+    transform.add_argument("--separator", default=", ", help="separator between output chords")
+
+    render = commands.add_parser(
+        "render", help="draw progressions read from files or stdin as PNG/SVG diagrams",
+        description="Reads one progression per line and writes one diagram per line, "
+                    "numbered by line, into the output directory.")
+    render.add_argument("inputs", nargs="*", default=["-"], metavar="FILE",
+                        help="input files ('-' or nothing for stdin)")
+    render.add_argument("-o", "--output-dir", required=True, help="directory for the images")
+    render.add_argument("-f", "--format", choices=("png", "svg"), default="png")
+    render.add_argument("-m", "--mirror", action="append", default=[], metavar="AXIS",
+                        choices=("horizontal", "vertical", "diagonal", "diagonal_neg"),
+                        help="also draw the progression mirrored across AXIS; repeat for several")
+    render.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    render.add_argument("--size", type=float, default=6, help="image size in inches")
+    render.add_argument("--dpi", type=int, default=100)
+
+    pack = commands.add_parser(
+        "pack", help="store progressions read from files or stdin as a binary corpus file",
+        description="Reads one progression per line and writes them all, one byte per chord, "
+                    "into a corpus file that opens memory-mapped.")
+    pack.add_argument("inputs", nargs="*", default=["-"], metavar="FILE",
+                      help="input files ('-' or nothing for stdin)")
+    pack.add_argument("-o", "--output", required=True, help="corpus file to write")
+
+    analyze = commands.add_parser(
+        "analyze", help="count chord frequencies and transitions in files or stdin",
+        description="Prints the chord frequencies and the most common transitions as JSON, "
+                    "or saves the full counts as .npz.")
+    analyze.add_argument("inputs", nargs="*", default=["-"], metavar="FILE",
+                         help="input files ('-' or nothing for stdin)")
+    analyze.add_argument("--top", type=int, default=20, help="transitions listed (default: 20)")
+    analyze.add_argument("-o", "--output", help="write frequencies and transitions to this .npz file")
+
+    serve = commands.add_parser(
+        "serve", help="answer transform requests over local HTTP/JSON",
+        description="Serves POST /transform, POST /chords and GET /metrics (see transform_service.py).")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of host:port")
+    serve.add_argument("--cache-size", type=int, default=None, help="progressions kept in the result cache")
+    serve.add_argument("--batch-window", type=float, default=None,
+                       help="seconds to wait for concurrent requests to batch together")
+    return parser
+
+
+def run_transform(args):
+    """Streams every input through the transform chain into the output.
+
+    Binary corpus files are read chunk by chunk and written out as text like the other inputs.
+    """
+    from batch_transforms import transform_ragged, transform_table
+    from circle_model import get_layout
+    from corpus_file import is_corpus_file
+    from progression_io import default_batch_size, format_progressions, parse_transform, stream_transform
+
+    chain = [parse_transform(step) for steps in args.transform for step in steps.split(",") if step]
+    try:
+        transform_table(chain, layout=args.layout)  # Reject unknown steps before reading any input
+    except ValueError as exc:
+        sys.exit(f"error: {exc}")
+
+    buffer_size = 1 << 20  # Large buffers so lines are read and written in bulk
+    out = sys.stdout if args.output == "-" else open(args.output, "w", buffering=buffer_size)
+    try:
+        for name in args.inputs:
+            if name != "-" and is_corpus_file(name):
+                for values, offsets in read_batches([name], args.batch_size or default_batch_size, args.layout):
+                    values, offsets = transform_ragged(values[offsets[0]:offsets[-1]], offsets - offsets[0],
+                                                       chain, layout=args.layout)
+                    out.write(format_progressions(values, offsets, get_layout(args.layout).labels,
+                                                  args.separator))
+                continue
+            infile = sys.stdin if name == "-" else open(name, buffering=buffer_size)
+            try:
+                stream_transform(infile, out, chain, args.batch_size or default_batch_size, args.separator,
+                                 layout=args.layout)
+            except ValueError as exc:
+                sys.exit(f"error: {name}: {exc}")
+            finally:
+                if infile is not sys.stdin:
+                    infile.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def read_batches(names, batch_size, layout="extended"):
+    """Yields the progressions of the named files as ragged (values, offsets) batches, in order.
+
+    Files are progression text, one per line, or binary corpus files.
+    """
+    from analytics import chunk_rows
+    from circle_model import get_layout
+    from corpus_file import is_corpus_file, read_corpus
+    from progression_io import parse_lines
+
+    layout = get_layout(layout)
+    for name in names:
+        if name != "-" and is_corpus_file(name):
+            try:
+                corpus = read_corpus(name)
+            except ValueError as exc:
+                sys.exit(f"error: {exc}")
+            if corpus.layout.labels != layout.labels:
+                sys.exit(f"error: {name}: corpus uses the {corpus.layout.name!r} layout, not {layout.name!r}")
+            for start, stop in chunk_rows(corpus.offsets):
+                yield corpus.values, corpus.offsets[start:stop + 1]
+            continue
+        infile = sys.stdin if name == "-" else open(name)
+        try:
+            line_number = 1
+            while True:
+                lines = list(itertools.islice(infile, batch_size))
+                if not lines:
+                    break
+                try:
+                    values, offsets = parse_lines(lines, layout.lookup, first_line=line_number,
+                                                  num_points=layout.num_points)
+                except ValueError as exc:
+                    sys.exit(f"error: {name}: {exc}")
+                line_number += len(lines)
+                yield values, offsets
+        finally:
+            if infile is not sys.stdin:
+                infile.close()
+
+
+def read_progressions(names, batch_size, layout="extended"):
+    """Yields the chord indices of every progression in the named files, in order."""
+    for values, offsets in read_batches(names, batch_size, layout):
+        for start, stop in zip(offsets[:-1], offsets[1:]):
+            yield values[start:stop]
+
+
+def count_transitions(names, layout="extended"):
+    """analytics.TransitionCounts of every progression in the named files."""
+    from analytics import TransitionCounts
+    from circle_model import get_layout
+    from progression_io import default_batch_size
+
+    counts = TransitionCounts(get_layout(layout).num_points)
+    for values, offsets in read_batches(names, default_batch_size, layout):
+        counts.add_ragged(values, offsets)
+    return counts
+
+
+def run_render(args):
+    """Renders every input progression into the output directory."""
+    from batch_render import render_files
+    from progression_io import default_batch_size
+
+    count = render_files(read_progressions(args.inputs, default_batch_size, args.layout), args.output_dir,
+                         format=args.format, mirrors=args.mirror, workers=args.workers,
+                         size=args.size, dpi=args.dpi, layout=args.layout)
+    print(f"{count} {args.format} files written to {args.output_dir}", file=sys.stderr)
+
+
+def run_pack(args):
+    """Packs every input progression into one corpus file, batch by batch."""
+    from corpus_file import write_corpus_batches
+    from progression_io import default_batch_size
+
+    count = write_corpus_batches(args.output, read_batches(args.inputs, default_batch_size, args.layout),
+                                 args.layout)
+    print(f"{count} progressions written to {args.output}", file=sys.stderr)
+
+
+def run_analyze(args):
+    """Prints (or saves) the chord statistics of every input progression."""
+    import json
+
+    import numpy as np
+
+    from circle_model import get_layout
+
+    counts = count_transitions(args.inputs, args.layout)
+    if args.output:
+        np.savez(args.output, frequencies=counts.frequencies, transitions=counts.transitions)
+    labels = get_layout(args.layout).labels
+    print(json.dumps({
+        "progressions": counts.progressions,
+        "frequencies": dict(zip(labels, counts.frequencies.tolist())),
+        "transitions": [[labels[a], labels[b], count] for a, b, count in counts.top(args.top)],
+    }, indent=2))
+
+
+def run_serve(args):
+    """Runs the transform service until interrupted."""
+    import asyncio
+
+    from transform_service import default_batch_window, default_cache_size, serve
+
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"Serving transforms on {where}", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, cache_size=args.cache_size or default_cache_size,
+                          batch_window=args.batch_window if args.batch_window is not None
+                          else default_batch_window))
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """Launches the interactive app, or runs the given command."""
+    args = build_parser().parse_args(argv)
+    if args.command == "transform":
+        return run_transform(args)
+    if args.command == "render":
+        return run_render(args)
+    if args.command == "pack":
+        return run_pack(args)
+    if args.command == "serve":
+        return run_serve(args)
+    if args.command == "analyze":
+        return run_analyze(args)
+
+    from circle_gui import CircleApp  # Lazy: pulls in matplotlib and a GUI backend
+    from instrumentation import profiler_from_options
+
+    try:
+        profiler = profiler_from_options(args.profile, args.profile_format)
+    except ValueError as exc:
+        sys.exit(f"error: {exc}")
+    layout = args.layout
+    if args.session and os.path.exists(args.session):
+        from corpus_file import read_corpus
+
+        try:
+            layout = read_corpus(args.session).layout  # The session's own layout wins
+        except ValueError as exc:
+            sys.exit(f"error: {exc}")
+    app = CircleApp(CircleModel(layout), profiler=profiler, session_path=args.session)
+    if args.session and os.path.exists(args.session):
+        app.load_session()
+    if args.transitions:
+        app.show_transitions(count_transitions(args.transitions, app.circle.layout))
+    app.show()
+    return app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Drawing styles shared by the interactive app and the headless renderer.
+
+Plain data only, so importing it pulls in neither matplotlib nor a GUI backend.
+"""
+
+# Styles of the mirror overlays, keyed by mirror axis
+mirror_styles = {
+    "horizontal": dict(color='r', linestyle='--', lw=3),  # Red dashed for horizontal mirror
+    "vertical": dict(color='b', linestyle='--', marker='.', lw=3),  # Blue dashed for vertical mirror
+    "diagonal": dict(color='y', linestyle='--', lw=3),  # Yellow dashed for diagonal mirror
+    "diagonal_neg": dict(color='m', linestyle='--', lw=3),  # Magenta dashed for y=-x mirror
+}
+
+
+def label_fontsize(num_points):
+    """Font size of the chord labels, smaller on circles with more than 24 points so they fit."""
+    return 12 * min(1, 24 / num_points)
@@ -0,0 +1,211 @@
+"""Compact binary files for progression corpora and GUI sessions.
+
+A file holds progressions in the ragged layout of batch_transforms (one chord
+index per chord plus an offsets array), the layout they belong to and the
+transforms that were active when it was saved:
+
+* 8 bytes of magic, a uint16 format version and the byte length (uint32) of
+  the JSON header that follows;
+* the JSON header: layout name (with its labels and axes unless it is a
+  registered layout), counts, dtype and byte positions of the two arrays,
+  rotation steps and shown mirror axes;
+* the chord indices (uint8 for up to 256 points), then the int64 offsets,
+  each starting on a 64-byte boundary.
+
+read_corpus() memory-maps both arrays, so opening a multi-gigabyte corpus is
+instant and the transforms read it in place, page by page, without copying it
+into memory first. A GUI session is a corpus of one progression.
+"""
+import json
+import os
+import struct
+
+import numpy as np
+
+from batch_transforms import transform_ragged
+from circle_model import Layout, get_layout, index_dtype, layouts
+
+magic = b"\x89CIRCLE\n"
+format_version = 1
+
+_prefix = struct.Struct("<8sHI")  # Magic, version, JSON header length
+_alignment = 64
+# Chords copied per write when saving
+_write_chunk = 1 << 24
+# Stand-in for the counts while streaming; the real header is never longer than one with these
+_placeholder_count = 10 ** 15
+
+
+def _aligned(position):
+    return -(-position // _alignment) * _alignment
+
+
+def _layout_header(layout):
+    if layouts.get(layout.name) is layout:
+        return {"layout": layout.name}
+    return {"layout": layout.name, "labels": list(layout.labels), "axes": layout.axes, "title": layout.title}
+
+
+def _header_layout(header):
+    name = header["layout"]
+    if "labels" not in header:
+        return get_layout(name)
+    if name in layouts and list(layouts[name].labels) == header["labels"] and layouts[name].axes == header["axes"]:
+        return layouts[name]
+    return Layout(name, header["labels"], header["axes"], header.get("title"))
+
+
+class Corpus:
+    """Progressions (chord indices, ragged) with their layout and active transforms."""
+
+    def __init__(self, values, offsets, layout="extended", rotation=0, mirrors=()):
+        self.values = values
+        self.offsets = offsets
+        self.layout = get_layout(layout)
+        self.rotation = int(rotation)  # Steps the labels were turned counterclockwise
+        self.mirrors = tuple(mirrors)  # Mirror axes that were shown
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for start, stop in zip(self.offsets[:-1], self.offsets[1:]):
+            yield self.values[start:stop]
+
+    def transform(self, chain, chunk_size=None, out=None):
+        """Applies a chain of transforms (see batch_transforms.transform_table); returns (values, offsets)."""
+        return transform_ragged(self.values, self.offsets, chain, chunk_size=chunk_size, out=out,
+                                layout=self.layout)
+
+    def save(self, path):
+        write_corpus(path, self.values, self.offsets, self.layout, self.rotation, self.mirrors)
+
+
+def _write_header(f, layout, num_chords, num_progressions, rotation, mirrors, values_start=0):
+    """Writes the prefix and JSON header, padded up to the values; returns the header.
+
+    The values start at values_start, or further on if the header does not fit before it.
+    """
+    dtype = np.dtype(index_dtype(layout.num_points))
+    header = {**_layout_header(layout), "num_points": layout.num_points, "dtype": dtype.str,
+              "chords": num_chords, "progressions": num_progressions,
+              "rotation": int(rotation), "mirrors": list(mirrors)}
+    # The array positions depend on the header length, which depends on them: grow until they fit
+    while True:
+        header["values_start"] = values_start
+        header["offsets_start"] = _aligned(values_start + num_chords * dtype.itemsize)
+        text = json.dumps(header).encode()
+        if _prefix.size + len(text) <= values_start:
+            break
+        values_start = _aligned(_prefix.size + len(text))
+    f.write(_prefix.pack(magic, format_version, len(text)))
+    f.write(text)
+    f.write(b"\0" * (values_start - f.tell()))
+    return header
+
+
+def write_corpus(path, values, offsets, layout="extended", rotation=0, mirrors=()):
+    """Saves progressions in the ragged layout (values may be any array, e.g. a memmap)."""
+    layout = get_layout(layout)
+    dtype = index_dtype(layout.num_points)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    start, stop = int(offsets[0]), int(offsets[-1])
+    with open(path, "wb") as f:
+        header = _write_header(f, layout, stop - start, len(offsets) - 1, rotation, mirrors)
+        for chunk_start in range(start, stop, _write_chunk):
+            f.write(np.ascontiguousarray(values[chunk_start:min(chunk_start + _write_chunk, stop)],
+                                         dtype=dtype).data)
+        f.write(b"\0" * (header["offsets_start"] - f.tell()))
+        f.write((offsets - start).data)
+
+
+def write_corpus_batches(path, batches, layout="extended", rotation=0, mirrors=()):
+    """Saves ragged (values, offsets) batches as they come; returns the number of progressions.
+
+    Each batch's chords are written straight to the file, so only the offsets
+    (8 bytes per progression) are held in memory. The header is written with
+    placeholder counts first and rewritten once the counts are known.
+    """
+    layout = get_layout(layout)
+    dtype = index_dtype(layout.num_points)
+    offsets = [np.zeros(1, dtype=np.int64)]
+    num_chords = 0
+    with open(path, "wb") as f:
+        values_start = _write_header(f, layout, _placeholder_count, _placeholder_count, rotation,
+                                     mirrors)["values_start"]
+        for values, batch_offsets in batches:
+            batch_offsets = np.asarray(batch_offsets, dtype=np.int64)
+            start, stop = int(batch_offsets[0]), int(batch_offsets[-1])
+            for chunk_start in range(start, stop, _write_chunk):
+                f.write(np.ascontiguousarray(values[chunk_start:min(chunk_start + _write_chunk, stop)],
+                                             dtype=dtype).data)
+            offsets.append(batch_offsets[1:] + (num_chords - start))
+            num_chords += stop - start
+        offsets = np.concatenate(offsets)
+        f.seek(0)
+        header = _write_header(f, layout, num_chords, len(offsets) - 1, rotation, mirrors, values_start)
+        f.seek(values_start + num_chords * np.dtype(dtype).itemsize)
+        f.write(b"\0" * (header["offsets_start"] - f.tell()))
+        f.write(offsets.data)
+    return len(offsets) - 1
+
+
+def read_header(path):
+    """Returns the JSON header of a corpus file, checking its magic and version."""
+    with open(path, "rb") as f:
+        prefix = f.read(_prefix.size)
+        if len(prefix) < _prefix.size or prefix[:len(magic)] != magic:
+            raise ValueError(f"{path}: not a progression corpus file")
+        _, version, length = _prefix.unpack(prefix)
+        if version != format_version:
+            raise ValueError(f"{path}: unsupported corpus format version {version}")
+        header = json.loads(f.read(length))
+    size = os.path.getsize(path)
+    if size < header["offsets_start"] + 8 * (header["progressions"] + 1):
+        raise ValueError(f"{path}: truncated corpus file")
+    return header
+
+
+def is_corpus_file(path):
+    """Whether path starts with the corpus file magic."""
+    with open(path, "rb") as f:
+        return f.read(len(magic)) == magic
+
+
+def read_corpus(path, mmap=True):
+    """Opens a corpus file; the arrays are read-only memmaps unless mmap is False."""
+    header = read_header(path)
+    dtype = np.dtype(header["dtype"])
+    arrays = []
+    for start, array_dtype, count in ((header["values_start"], dtype, header["chords"]),
+                                      (header["offsets_start"], np.int64, header["progressions"] + 1)):
+        if not mmap:
+            arrays.append(np.fromfile(path, dtype=array_dtype, count=count, offset=start))
+        elif count:
+            arrays.append(np.memmap(path, dtype=array_dtype, mode="r", offset=start, shape=(count,)))
+        else:
+            arrays.append(np.zeros(0, dtype=array_dtype))  # mmap cannot map zero bytes
+    return Corpus(*arrays, _header_layout(header), header["rotation"], header["mirrors"])
+
+
+def transform_file(source, destination, chain, chunk_size=None):
+    """Transforms a corpus file into a new one, memory-mapped at both ends.
+
+    The output keeps the source's layout, offsets and transform flags; memory
+    use is bounded by chunk_size chords whatever the file size.
+    """
+    corpus = read_corpus(source)
+    with open(destination, "wb") as f:
+        header = _write_header(f, corpus.layout, len(corpus.values), len(corpus), corpus.rotation,
+                               corpus.mirrors)
+        f.seek(header["offsets_start"])
+        f.write(np.ascontiguousarray(corpus.offsets).data)
+    if len(corpus.values):
+        out = np.memmap(destination, dtype=header["dtype"], mode="r+", offset=header["values_start"],
+                        shape=(len(corpus.values),))
+        corpus.transform(chain, chunk_size=chunk_size, out=out)
+        out.flush()
+    return len(corpus)
@@ -0,0 +1,124 @@
+"""Undo/redo for progression edits, as a bounded log of deltas.
+
+Every edit goes through a History, which applies it to the Progression and
+records just enough to reverse it: the appended or popped position, or the
+vertex index with its old and new positions. Undo and redo are O(1) for these
+edits, and the progression's tracked transform views follow along because they
+are updated by the same Progression methods. Only clearing stores the cleared
+positions.
+
+The log holds at most max_edits undo steps; the oldest are evicted first, so
+memory stays flat in long sessions. Consecutive moves of the same vertex (one
+drag) collapse into a single step until break_group() is called.
+"""
+import collections
+
+# Undo steps kept by default
+default_max_edits = 1000
+
+
+class History:
+    """Applies edits to a Progression and keeps them for undo and redo."""
+
+    def __init__(self, progression, max_edits=default_max_edits, coalesce_moves=True):
+        self.progression = progression
+        self.max_edits = max_edits  # None keeps every edit
+        self.coalesce_moves = coalesce_moves
+        self.undo_stack = collections.deque(maxlen=max_edits)
+        self.redo_stack = collections.deque(maxlen=max_edits)
+        self.evicted = 0  # Edits dropped from the bottom of the undo stack
+        self.grouping = False  # Whether the next move may merge into the last one
+
+    def __len__(self):
+        return len(self.undo_stack)
+
+    def record(self, edit):
+        if self.max_edits is not None and len(self.undo_stack) == self.max_edits:
+            self.evicted += 1  # The deque drops the oldest edit on append
+        self.undo_stack.append(edit)
+        self.redo_stack.clear()
+
+    def break_group(self):
+        """Ends the current run of moves, so the next move is its own undo step."""
+        self.grouping = False
+
+    def append(self, position):
+        position = int(position)
+        self.progression.append(position)
+        self.record(("append", position))
+        self.grouping = False
+
+    def pop(self):
+        position = self.progression.positions[-1]
+        self.progression.pop()
+        self.record(("pop", position))
+        self.grouping = False
+
+    def move(self, index, position):
+        """Moves one vertex; returns False (recording nothing) if it is already there."""
+        position = int(position)
+        old = self.progression.positions[index]
+        if old == position:
+            return False
+        self.progression.move(index, position)
+        last = self.undo_stack[-1] if self.undo_stack else ()
+        if self.coalesce_moves and self.grouping and last[:2] == ("move", index):
+            self.undo_stack[-1] = ("move", index, last[2], position)  # Same drag: keep the first old position
+            self.redo_stack.clear()
+        else:
+            self.record(("move", index, old, position))
+        self.grouping = True
+        return True
+
+    def clear(self):
+        if not len(self.progression):
+            return
+        positions = tuple(self.progression.positions)
+        self.progression.clear()
+        self.record(("clear", positions))
+        self.grouping = False
+
+    def undo(self):
+        """Reverts the last edit; returns False if there is nothing to undo."""
+        if not self.undo_stack:
+            return False
+        edit = self.undo_stack.pop()
+        self.revert(edit)
+        self.redo_stack.append(edit)
+        self.grouping = False
+        return True
+
+    def redo(self):
+        """Re-applies the last undone edit; returns False if there is nothing to redo."""
+        if not self.redo_stack:
+            return False
+        edit = self.redo_stack.pop()
+        self.apply(edit)
+        self.undo_stack.append(edit)
+        self.grouping = False
+        return True
+
+    def apply(self, edit):
+        progression = self.progression
+        kind = edit[0]
+        if kind == "append":
+            progression.append(edit[1])
+        elif kind == "pop":
+            progression.pop()
+        elif kind == "move":
+            progression.move(edit[1], edit[3])
+        elif kind == "clear":
+            progression.clear()
+
+    def revert(self, edit):
+        progression = self.progression
+        kind = edit[0]
+        if kind == "append":
+            progression.pop()
+        elif kind == "pop":
+            progression.append(edit[1])
+        elif kind == "move":
+            progression.move(edit[1], edit[2])
+        elif kind == "clear":
+            for position in edit[1]:
+                progression.append(position)
@@ -0,0 +1,165 @@
+"""Opt-in profiling of the GUI event handlers.
+
+A Profiler attached to a CircleApp records every callback the canvas
+dispatches (including the ones the button widgets register) and every
+Button.on_clicked handler. Each call records its wall time and how many
+full canvas draws, draw requests, blits and artist draws happened while it
+ran. Calls go to a fixed-size ring buffer, totals per handler are kept
+separately, and both can be written as JSON or as a Chrome trace-event file
+(open it in chrome://tracing or https://ui.perfetto.dev).
+
+Nothing is wrapped unless a profiler is attached, so the cost is zero when
+profiling is off. Enable it with ``--profile PATH`` or the CIRCLE_PROFILE
+environment variable:
+
+    CIRCLE_PROFILE=profile.json CIRCLE_PROFILE_FORMAT=chrome python circle_of_fifths.py
+"""
+import atexit
+import collections
+import functools
+import json
+import os
+import time
+
+# Calls kept in the ring buffer; older calls only survive in the per-handler totals
+default_capacity = 1 << 16
+
+formats = ("json", "chrome")
+
+# Indices into Profiler.counters
+FULL_DRAWS, DRAW_REQUESTS, BLITS, ARTISTS = range(4)
+counter_names = ("full_draws", "draw_requests", "blits", "artists")
+
+
+class Profiler:
+    """Records handler calls in a ring buffer, with totals per handler."""
+
+    def __init__(self, capacity=default_capacity):
+        self.start_ns = time.perf_counter_ns()
+        self.calls = collections.deque(maxlen=capacity)  # (name, start, duration, *counter deltas)
+        self.totals = {}  # Handler name -> [calls, total ns, max ns, *counter totals]
+        self.counters = [0, 0, 0, 0]  # Running counts, see counter_names
+
+    def wrap(self, name, func):
+        """Returns func wrapped so that its calls are recorded under name."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(name, func, *args, **kwargs)
+
+        return wrapper
+
+    def call(self, name, func, *args, **kwargs):
+        """Calls func, recording the call under name."""
+        counters = self.counters
+        before = counters.copy()
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter_ns() - start
+            deltas = [after - prior for after, prior in zip(counters, before)]
+            self.calls.append((name, start, duration, *deltas))
+            total = self.totals.get(name)
+            if total is None:
+                total = self.totals[name] = [0, 0, 0, 0, 0, 0, 0]
+            total[0] += 1
+            total[1] += duration
+            total[2] = max(total[2], duration)
+            for i, delta in enumerate(deltas, 3):
+                total[i] += delta
+
+    def count(self, index, func):
+        """Returns func wrapped so that each call bumps one of the counters."""
+        counters = self.counters
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            counters[index] += 1
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    def attach(self, canvas):
+        """Instruments a canvas: all of its callbacks, its draws, draw requests and blits.
+
+        The callback registry's dispatch is replaced, not its entries, so every
+        callback is recorded whenever it was connected, and connection ids stay
+        valid for mpl_disconnect and closing the figure.
+        """
+        registry = canvas.callbacks
+        dispatch = registry.process
+
+        def process(signal, *args, **kwargs):
+            if signal not in registry.callbacks:
+                return dispatch(signal, *args, **kwargs)  # Lets the registry validate the signal
+            for ref in list(registry.callbacks[signal].values()):
+                func = ref()
+                if func is None:
+                    continue
+                name = f"{signal}:{getattr(func, '__qualname__', repr(func))}"
+                try:
+                    self.call(name, func, *args, **kwargs)
+                except Exception as exc:  # Same handling as CallbackRegistry.process
+                    if registry.exception_handler is None:
+                        raise
+                    registry.exception_handler(exc)
+
+        registry.process = process
+        canvas.draw = self.wrap("canvas.draw", self.count(FULL_DRAWS, canvas.draw))
+        canvas.draw_idle = self.count(DRAW_REQUESTS, canvas.draw_idle)
+        canvas.blit = self.count(BLITS, canvas.blit)
+
+    def attach_axes(self, ax):
+        """Counts the artists drawn one by one (by blitting) into an axes."""
+        ax.draw_artist = self.count(ARTISTS, ax.draw_artist)
+
+    def summary(self):
+        """Totals per handler, slowest total first."""
+        handlers = {}
+        for name, (calls, total_ns, max_ns, *counts) in sorted(self.totals.items(),
+                                                               key=lambda item: -item[1][1]):
+            handlers[name] = {"calls": calls, "total_ms": total_ns / 1e6,
+                              "mean_ms": total_ns / calls / 1e6, "max_ms": max_ns / 1e6,
+                              **dict(zip(counter_names, counts))}
+        return handlers
+
+    def to_json(self):
+        calls = [{"name": name, "start_ms": (start - self.start_ns) / 1e6, "duration_ms": duration / 1e6,
+                  **dict(zip(counter_names, deltas))}
+                 for name, start, duration, *deltas in self.calls]
+        return {"handlers": self.summary(), "calls": calls}
+
+    def to_chrome_trace(self):
+        """The recorded calls as Chrome trace "complete" events (times in microseconds)."""
+        pid = os.getpid()
+        events = [{"name": name, "cat": name.split(":")[0], "ph": "X", "pid": pid, "tid": 0,
+                   "ts": (start - self.start_ns) / 1e3, "dur": duration / 1e3,
+                   "args": dict(zip(counter_names, deltas))}
+                  for name, start, duration, *deltas in self.calls]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path, format="json"):
+        """Writes the recorded data to path as "json" or "chrome" trace events."""
+        if format not in formats:
+            raise ValueError(f"Unknown profile format: {format!r}")
+        data = self.to_chrome_trace() if format == "chrome" else self.to_json()
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+def profiler_from_options(path=None, format=None):
+    """Returns a Profiler that dumps to path at exit, or None when profiling is off.
+
+    path and format default to the CIRCLE_PROFILE and CIRCLE_PROFILE_FORMAT
+    environment variables.
+    """
+    path = path or os.environ.get("CIRCLE_PROFILE")
+    if not path:
+        return None
+    format = format or os.environ.get("CIRCLE_PROFILE_FORMAT") or "json"
+    if format not in formats:
+        raise ValueError(f"Unknown profile format: {format!r}")
+    profiler = Profiler()
+    atexit.register(profiler.dump, path, format)
+    return profiler
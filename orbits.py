@@ -0,0 +1,207 @@
+"""Symmetry orbits and canonical forms of chord progressions.
+
+The four mirrors and the one-step rotation of rotate_circle generate a group of
+permutations of the circle (the 48 symmetries of the 24-gon). Two progressions
+are equivalent when one of those permutations maps one onto the other; the
+canonical form of a progression is the lexicographically smallest member of its
+orbit, so equivalent progressions share it and can be hashed and deduplicated.
+
+Progressions are chord indices as in batch_transforms: a 2-D array with one
+progression per row (optionally padded with a fill value), or the ragged
+values/offsets layout. As there, a layout (a name or Layout) replaces
+num_points, and its own mirror axes generate the group.
+"""
+import weakref
+
+import numpy as np
+
+from circle_model import get_layout, index_dtype
+
+_group_cache = weakref.WeakKeyDictionary()  # Layout -> its group tables
+
+
+def _layout(num_points, layout):
+    return get_layout(layout if layout is not None else num_points)
+
+
+def group_tables(num_points=24, layout=None):
+    """Returns every permutation in the symmetry group as a (group size, num_points) array.
+
+    The group is the closure of the layout's mirror tables and the one-step
+    rotation; row 0 is the identity. Tables are computed once per layout.
+    """
+    layout = _layout(num_points, layout)
+    if layout in _group_cache:
+        return _group_cache[layout]
+
+    num_points = layout.num_points
+    generators = [*layout.mirror_tables.values(), layout.rotation(1)]
+    identity = np.arange(num_points, dtype=index_dtype(num_points))
+    seen = {identity.tobytes()}
+    elements = [identity]
+    frontier = [identity]
+    while frontier:
+        next_frontier = []
+        for element in frontier:
+            for generator in generators:
+                product = generator[element]
+                key = product.tobytes()
+                if key not in seen:
+                    seen.add(key)
+                    elements.append(product)
+                    next_frontier.append(product)
+        frontier = next_frontier
+
+    tables = np.stack(elements)
+    tables.setflags(write=False)
+    _group_cache[layout] = tables
+    return tables
+
+
+def orbit(progression, num_points=24, layout=None):
+    """Returns the distinct images of one progression under the symmetry group, sorted."""
+    progression = np.asarray(progression)
+    images = group_tables(num_points, layout)[:, progression]
+    return np.unique(images, axis=0)
+
+
+def _lexmin(candidates, fill):
+    """Index of the lexicographically smallest of k candidate rows, for each of N rows.
+
+    candidates has shape (N, k, L); fill entries compare greater than any chord.
+    """
+    num_rows, k, length = candidates.shape
+    alive = np.ones((num_rows, k), dtype=bool)
+    big = np.iinfo(np.int64).max
+    for column in range(length):
+        values = candidates[:, :, column].astype(np.int64)
+        if fill is not None:
+            values[values == fill] = big - 1
+        values[~alive] = big
+        alive &= values == values.min(axis=1, keepdims=True)
+    return alive.argmax(axis=1)
+
+
+def canonical_form(progressions, num_points=24, fill=None, return_element=False, layout=None):
+    """Canonicalizes every row of a 2-D array of progressions.
+
+    Each row is replaced by the lexicographically smallest row in its orbit;
+    entries equal to fill (padding at the end of a row) are kept in place. With
+    return_element, also returns the index into group_tables() of the
+    permutation that produced each canonical row.
+    """
+    layout = _layout(num_points, layout)
+    num_points = layout.num_points
+    progressions = np.atleast_2d(np.asarray(progressions))
+    num_rows, length = progressions.shape
+    group = group_tables(layout=layout)
+    if length == 0 or num_rows == 0:
+        elements = np.zeros(num_rows, dtype=np.intp)
+        return (progressions.copy(), elements) if return_element else progressions.copy()
+
+    # Extra table column so padding maps to itself under every permutation
+    sentinel = num_points
+    extended = np.concatenate([group, np.full((len(group), 1), sentinel, dtype=group.dtype)], axis=1)
+    indices = progressions if fill is None else np.where(progressions == fill, sentinel, progressions)
+
+    # The smallest row must start with the smallest reachable first chord, which
+    # only a few group elements (the stabilizer coset) produce: keep just those
+    first = extended[:, indices[:, 0]].T  # (N, group size)
+    is_candidate = first == first.min(axis=1, keepdims=True)
+    is_candidate[indices[:, 0] == sentinel, 1:] = False  # Empty rows: the identity will do
+    counts = is_candidate.sum(axis=1)
+    k = int(counts.max())
+    if (counts == k).all():
+        # Usual case (a transitive group): the same number of candidates in every row
+        order = np.nonzero(is_candidate)[1].reshape(num_rows, k)
+    else:
+        # Candidate element ids per row, padded by repeating the row's first candidate
+        order = np.argsort(~is_candidate, axis=1, kind='stable')[:, :k]
+        order = np.where(np.arange(k) < counts[:, None], order, order[:, :1])
+
+    candidates = extended[order[:, :, None], indices[:, None, :]]  # (N, k, L)
+    best = _lexmin(candidates, sentinel)
+    elements = order[np.arange(num_rows), best]
+    canonical = candidates[np.arange(num_rows), best].astype(
+        np.result_type(progressions.dtype, group.dtype), copy=False)
+    if fill is not None:
+        canonical[canonical == sentinel] = fill
+    return (canonical, elements) if return_element else canonical
+
+
+def pad_ragged(values, offsets, fill):
+    """Expands the ragged layout into a padded 2-D array and the row lengths."""
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if len(lengths) else 0
+    dtype = np.result_type(values.dtype, np.min_scalar_type(fill))
+    padded = np.full((len(lengths), width), fill, dtype=dtype)
+    mask = np.arange(width) < lengths[:, None]
+    padded[mask] = values[offsets[0]:offsets[-1]]
+    return padded, lengths
+
+
+def canonical_ragged(values, offsets, num_points=24, layout=None):
+    """Canonicalizes progressions in the ragged layout; returns new values and the same offsets."""
+    layout = _layout(num_points, layout)
+    values = np.asarray(values)
+    offsets = np.asarray(offsets)
+    fill = layout.num_points  # Never a chord index
+    padded, lengths = pad_ragged(values, offsets, fill)
+    canonical = canonical_form(padded, fill=fill, layout=layout)
+    mask = np.arange(padded.shape[1]) < lengths[:, None]
+    return canonical[mask].astype(values.dtype, copy=False), offsets
+
+
+class CanonicalIndex:
+    """Hash index of canonical forms, for deduplicating progressions in one streaming pass.
+
+    Keys are the bytes of the canonical rows (without padding), so lookups are
+    exact; memory grows with the number of distinct orbits, not with the input.
+    """
+
+    def __init__(self, num_points=24, layout=None):
+        self.layout = _layout(num_points, layout)
+        self.num_points = self.layout.num_points
+        self.counts = {}  # Canonical bytes -> number of progressions seen in that orbit
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, progression):
+        return self._keys(np.atleast_2d(progression), None)[0] in self.counts
+
+    def _keys(self, progressions, fill):
+        canonical = canonical_form(progressions, fill=fill, layout=self.layout).astype(
+            index_dtype(self.num_points + 1), copy=False)
+        if fill is None:
+            return [row.tobytes() for row in canonical]
+        lengths = (progressions != fill).sum(axis=1)
+        return [row[:length].tobytes() for row, length in zip(canonical, lengths)]
+
+    def add(self, progressions, fill=None):
+        """Adds a 2-D batch of progressions; returns a mask of those whose orbit was new."""
+        progressions = np.atleast_2d(np.asarray(progressions))
+        counts = self.counts
+        is_new = np.zeros(len(progressions), dtype=bool)
+        for i, key in enumerate(self._keys(progressions, fill)):
+            seen = counts.get(key, 0)
+            is_new[i] = seen == 0
+            counts[key] = seen + 1
+        return is_new
+
+    def add_ragged(self, values, offsets):
+        """Adds progressions in the ragged layout; returns a mask of those whose orbit was new."""
+        fill = self.num_points
+        padded, _ = pad_ragged(np.asarray(values), np.asarray(offsets), fill)
+        return self.add(padded, fill=fill)
+
+
+def dedupe(chunks, num_points=24, fill=None, index=None, layout=None):
+    """Streams 2-D chunks of progressions, yielding each chunk reduced to its first-seen orbits.
+
+    Only one chunk is held at a time besides the index itself.
+    """
+    index = index if index is not None else CanonicalIndex(num_points, layout)
+    for chunk in chunks:
+        chunk = np.atleast_2d(np.asarray(chunk))
+        yield chunk[index.add(chunk, fill=fill)]
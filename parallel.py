@@ -0,0 +1,109 @@
+"""Multi-core execution of the batch transforms for large progression corpora.
+
+The input array is copied once into a shared memory block and every worker
+process writes its rows straight into a shared output block, so chunks never
+travel through pickling; only (start, stop) row ranges are sent to the
+workers. Each chunk lands at its own rows, so the output order always matches
+the input.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from batch_transforms import transform
+from orbits import canonical_form
+
+# Rows handed to a worker per task
+default_chunk_rows = 1 << 16
+
+# Per-worker state set up by _init_worker: the operation and the attached arrays
+_worker = {}
+
+
+def _init_worker(operation, args, kwargs, source, target):
+    """Attaches the shared input and output arrays once per worker process."""
+    # Workers share the parent's resource tracker, so attaching does not take ownership
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in (source, target)]
+    _worker.update(
+        operation=operation, args=args, kwargs=kwargs, blocks=blocks,
+        source=np.ndarray(source[1], dtype=source[2], buffer=blocks[0].buf),
+        target=np.ndarray(target[1], dtype=target[2], buffer=blocks[1].buf),
+    )
+
+
+def _run_chunk(start, stop):
+    """Applies the operation to rows start:stop of the shared input, writing the shared output."""
+    result = _worker["operation"](_worker["source"][start:stop], *_worker["args"], **_worker["kwargs"])
+    _worker["target"][start:stop] = result
+    return stop - start
+
+
+def _shared_array(shape, dtype):
+    """Allocates a shared memory block and an ndarray viewing it."""
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def run_parallel(operation, rows, *args, workers=None, chunk_rows=None, **kwargs):
+    """Applies operation(rows[start:stop], *args, **kwargs) chunk by chunk on a process pool.
+
+    operation must be a module-level function returning one output row per
+    input row; the output dtype and row shape are taken from a one-row probe.
+    workers defaults to the number of CPUs and chunk_rows to default_chunk_rows.
+    """
+    rows = np.asarray(rows)
+    workers = workers or os.cpu_count() or 1
+    chunk_rows = chunk_rows or default_chunk_rows
+    probe = np.asarray(operation(rows[:1], *args, **kwargs))
+    shape = (len(rows),) + probe.shape[1:]
+
+    if workers == 1 or len(rows) <= chunk_rows:
+        return np.asarray(operation(rows, *args, **kwargs))
+
+    blocks = []
+    try:
+        source_block, source = _shared_array(rows.shape, rows.dtype)
+        blocks.append(source_block)
+        target_block, target = _shared_array(shape, probe.dtype)
+        blocks.append(target_block)
+        source[...] = rows
+        specs = [(block.name, array.shape, array.dtype.str)
+                 for block, array in ((source_block, source), (target_block, target))]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(operation, args, kwargs, *specs)) as pool:
+            starts = range(0, len(rows), chunk_rows)
+            futures = [pool.submit(_run_chunk, start, min(start + chunk_rows, len(rows))) for start in starts]
+            for future in futures:
+                future.result()  # Re-raises the first worker error
+        result = target.copy()
+    finally:
+        source = target = None  # Release the views before closing the blocks
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return result
+
+
+def parallel_transform(progressions, chain, num_points=24, fill=None, workers=None, chunk_rows=None,
+                       layout=None):
+    """batch_transforms.transform() spread over worker processes."""
+    return run_parallel(transform, progressions, chain, num_points, fill,
+                        workers=workers, chunk_rows=chunk_rows, layout=layout)
+
+
+def parallel_transform_ragged(values, offsets, chain, num_points=24, workers=None, chunk_rows=None,
+                              layout=None):
+    """batch_transforms.transform_ragged() spread over worker processes."""
+    return parallel_transform(values, chain, num_points, workers=workers, chunk_rows=chunk_rows,
+                              layout=layout), offsets
+
+
+def parallel_canonical_form(progressions, num_points=24, fill=None, workers=None, chunk_rows=None,
+                            layout=None):
+    """orbits.canonical_form() spread over worker processes."""
+    return run_parallel(canonical_form, progressions, num_points, fill,
+                        workers=workers, chunk_rows=chunk_rows, layout=layout)
@@ -0,0 +1,93 @@
+"""Reading and writing chord-name progressions as text, in bounded memory.
+
+A progression file has one progression per line, with chord names from
+circle_model.chords separated by commas and/or whitespace, e.g.
+``C, G, Am, F``. Lines are processed in batches: each batch is parsed into
+the ragged values/offsets layout of batch_transforms, transformed with one
+vectorized gather and written back with a single write call.
+"""
+import itertools
+import re
+
+import numpy as np
+
+from batch_transforms import transform_ragged
+from circle_model import chords, get_layout, index_dtype, label_lookup
+
+# Lines parsed, transformed and written per batch
+default_batch_size = 1 << 16
+
+_separators = re.compile(r"[,\s]+")
+
+
+def parse_lines(lines, lookup=None, first_line=1, num_points=24):
+    """Parses progression lines into ragged values and offsets.
+
+    Raises ValueError naming the line of the first unknown chord.
+    """
+    lookup = lookup if lookup is not None else label_lookup(chords)
+    # Tokenize the whole batch at once, with a marker token closing every line
+    text = "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+    if "|" in text:
+        _raise_unknown_chord(lines, lookup, first_line)  # The marker is not a chord either
+    tokens = text.replace(",", " ").replace("\n", " \n| ").split()
+    end_of_line = num_points  # Never a chord index
+    try:
+        ids = np.fromiter(map({**lookup, "|": end_of_line}.__getitem__, tokens), dtype=np.int64,
+                          count=len(tokens))
+    except KeyError:
+        _raise_unknown_chord(lines, lookup, first_line)
+    line_ends = np.flatnonzero(ids == end_of_line)
+    values = ids[ids != end_of_line].astype(index_dtype(num_points))
+    offsets = np.zeros(len(line_ends) + 1, dtype=np.int64)
+    offsets[1:] = line_ends - np.arange(len(line_ends))  # Chords before each marker
+    return values, offsets
+
+
+def _raise_unknown_chord(lines, lookup, first_line):
+    """Finds the first unknown chord line by line, for the error message."""
+    for line_number, line in enumerate(lines, first_line):
+        for name in _separators.split(line.strip()):
+            if name and name not in lookup:
+                raise ValueError(f"line {line_number}: unknown chord {name!r}")
+
+
+def format_progressions(values, offsets, chord_names=chords, separator=", "):
+    """Formats ragged progressions as text, one line per progression."""
+    names = np.array(chord_names, dtype=object)[values].tolist()
+    lines = [separator.join(names[start:stop]) for start, stop in zip(offsets[:-1], offsets[1:])]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def stream_transform(infile, outfile, chain, batch_size=default_batch_size, separator=", ",
+                     chord_names=chords, layout=None):
+    """Transforms every progression line of infile and writes the results to outfile.
+
+    Memory use is bounded by batch_size lines, whatever the size of the input.
+    A layout (name or Layout) replaces chord_names, adding its own mirror axes.
+    Returns the number of progressions written.
+    """
+    if layout is not None:
+        layout = get_layout(layout)
+        chord_names = layout.labels
+        lookup = layout.lookup
+    else:
+        lookup = label_lookup(chord_names)
+    num_points = len(chord_names)
+    written = 0
+    while True:
+        lines = list(itertools.islice(infile, batch_size))
+        if not lines:
+            return written
+        values, offsets = parse_lines(lines, lookup, first_line=written + 1, num_points=num_points)
+        values, offsets = transform_ragged(values, offsets, chain, num_points, layout=layout)
+        outfile.write(format_progressions(values, offsets, chord_names, separator))
+        written += len(lines)
+
+
+def parse_transform(step):
+    """Parses one command-line transform step: a mirror axis, a rotation direction or a signed step count."""
+    try:
+        return int(step)
+    except ValueError:
+        return step
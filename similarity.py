@@ -0,0 +1,315 @@
+"""Shape search over a progression corpus, invariant under rotation and the mirrors.
+
+A progression's shape on the circle is its sequence of steps between
+consecutive chords, mod num_points: rotating the labels leaves the steps
+unchanged, and each of the four mirrors negates all of them. The canonical
+shape is the lexicographically smaller of the steps and their negation, so two
+progressions have equal canonical shapes exactly when one maps onto the other
+under the symmetry group (see orbits.py).
+
+ShapeIndex stores the canonical steps of every progression (ragged, as in
+batch_transforms), a sorted table of shape fingerprints for exact queries, and
+an inverted index from step n-grams ("grams") to the progressions containing
+them for approximate queries. Approximate matches are within an edit distance
+on the step sequences: an inserted, deleted or replaced step each costs 1.
+An index is saved as a directory of .npy files and loaded memory-mapped, so
+opening an index of millions of progressions is instant.
+"""
+import json
+import os
+
+import numpy as np
+
+from circle_model import get_layout
+
+format_version = 1
+
+# Steps per gram in the inverted index
+default_gram = 3
+
+_fingerprint_base = np.uint64(0x100000001B3)
+_arrays = ("steps", "step_offsets", "fingerprints", "fingerprint_rows", "gram_offsets", "postings")
+
+
+def shape_steps(values, offsets, num_points=24):
+    """Canonical step sequences of ragged progressions; returns (steps, step_offsets).
+
+    A progression of L chords has max(L - 1, 0) steps.
+    """
+    values = np.asarray(values)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = values[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+    dtype = np.min_scalar_type(num_points - 1)
+    diffs = ((values[1:].astype(np.int64) - values[:-1]) % num_points).astype(dtype)
+    # Drop the differences that cross from one progression into the next
+    keep = np.ones(len(diffs), dtype=bool)
+    ends = offsets[1:] - 1
+    keep[ends[(ends >= 0) & (ends < len(diffs))]] = False
+    steps = diffs[keep]
+    lengths = np.maximum(np.diff(offsets) - 1, 0)
+    step_offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=step_offsets[1:])
+    return _canonical(steps, lengths, num_points), step_offsets
+
+
+def _canonical(steps, lengths, num_points):
+    """Negates the ragged rows whose negation is smaller at the first step where the two differ."""
+    negated = ((num_points - steps.astype(np.int64)) % num_points).astype(steps.dtype)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    differs = np.flatnonzero(steps != negated)
+    first_rows, first = np.unique(rows[differs], return_index=True)
+    flip = np.zeros(len(lengths), dtype=bool)
+    flip[first_rows] = negated[differs[first]] < steps[differs[first]]
+    return np.where(flip[rows], negated, steps)
+
+
+def canonical_steps(progression, num_points=24):
+    """Canonical step sequence of one progression (chord indices)."""
+    progression = np.asarray(progression)
+    steps, _ = shape_steps(progression, np.array([0, len(progression)]), num_points)
+    return steps
+
+
+def _fingerprints(steps, step_offsets):
+    """64-bit polynomial hash of every ragged row (wrapping uint64 arithmetic)."""
+    lengths = np.diff(step_offsets)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(len(steps)) - step_offsets[rows]
+    powers = np.ones(int(lengths.max()) if len(lengths) and len(steps) else 1, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        powers[1:] = _fingerprint_base
+        powers = np.cumprod(powers, dtype=np.uint64)
+        terms = (steps.astype(np.uint64) + np.uint64(1)) * powers[position]
+        hashes = np.zeros(len(lengths), dtype=np.uint64)
+        nonempty = lengths > 0
+        if len(terms):
+            hashes[nonempty] = np.add.reduceat(terms, step_offsets[:-1][nonempty])
+        hashes ^= lengths.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return hashes
+
+
+def _gram_keys(steps, num_points, gram):
+    """Key of every gram of one step sequence."""
+    steps = np.asarray(steps, dtype=np.int64)
+    count = len(steps) - gram + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    keys = np.zeros(count, dtype=np.int64)
+    for t in range(gram):
+        keys += steps[t:t + count] * num_points ** t
+    return keys
+
+
+def neighbourhood(steps, num_points, max_distance):
+    """Every step sequence within max_distance edits of steps, mapped to its distance."""
+    found = {tuple(steps): 0}
+    frontier = list(found)
+    alphabet = range(num_points)
+    for distance in range(1, max_distance + 1):
+        reached = []
+        for seq in frontier:
+            for i in range(len(seq) + 1):
+                head, tail = seq[:i], seq[i:]
+                reached.extend(head + (step,) + tail for step in alphabet)  # Insertions
+                if tail:
+                    reached.append(head + tail[1:])  # Deletion
+                    reached.extend(head + (step,) + tail[1:] for step in alphabet)  # Replacements
+        frontier = []
+        for seq in reached:
+            if seq not in found:
+                found[seq] = distance
+                frontier.append(seq)
+    return found
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance between two sequences; stops early (returning limit + 1) past limit."""
+    a = list(a)
+    b = list(b)
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class ShapeIndex:
+    """Exact and approximate shape queries over a corpus of progressions.
+
+    Build one with ShapeIndex.build(values, offsets) from the ragged layout,
+    save() it and load() it back memory-mapped. Query results are row numbers
+    into the corpus the index was built from.
+    """
+
+    def __init__(self, arrays, num_points=24, gram=default_gram, layout=None):
+        self.num_points = num_points
+        self.gram = gram
+        self.layout = layout  # Name of the layout the chords belong to, if known
+        for name in _arrays:
+            setattr(self, name, arrays[name])
+        self.step_lengths = None  # Computed on the first approximate query
+
+    def __len__(self):
+        return len(self.step_offsets) - 1
+
+    @classmethod
+    def build(cls, values, offsets, num_points=24, gram=default_gram, layout=None):
+        """Indexes progressions given as chord indices in the ragged layout."""
+        if layout is not None:
+            layout = get_layout(layout)
+            num_points = layout.num_points
+        if num_points ** gram > 1 << 26:
+            raise ValueError(f"Grams of {gram} steps on {num_points} points need too many keys")
+        steps, step_offsets = shape_steps(values, offsets, num_points)
+        num_rows = len(step_offsets) - 1
+        row_dtype = np.min_scalar_type(max(num_rows - 1, 0))
+
+        fingerprints = _fingerprints(steps, step_offsets)
+        order = np.argsort(fingerprints, kind="stable")
+
+        # Every gram start that fits inside its row, keyed by the gram's steps
+        lengths = np.diff(step_offsets)
+        rows = np.repeat(np.arange(num_rows), lengths)
+        starts = np.flatnonzero(np.arange(len(steps)) - step_offsets[rows] <= lengths[rows] - gram)
+        keys = np.zeros(len(starts), dtype=np.int64)
+        for t in range(gram):
+            keys += steps[starts + t].astype(np.int64) * num_points ** t
+        # One posting per (gram, row), sorted by gram then row
+        pairs = np.unique(keys * max(num_rows, 1) + rows[starts])
+        keys, posting_rows = np.divmod(pairs, max(num_rows, 1))
+        gram_offsets = np.zeros(num_points ** gram + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=num_points ** gram), out=gram_offsets[1:])
+
+        arrays = {
+            "steps": steps, "step_offsets": step_offsets,
+            "fingerprints": fingerprints[order], "fingerprint_rows": order.astype(row_dtype),
+            "gram_offsets": gram_offsets, "postings": posting_rows.astype(row_dtype),
+        }
+        return cls(arrays, num_points, gram, layout.name if layout is not None else None)
+
+    def save(self, path):
+        """Writes the index as a directory of .npy files plus a small JSON header."""
+        os.makedirs(path, exist_ok=True)
+        for name in _arrays:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        header = {"version": format_version, "num_points": self.num_points, "gram": self.gram,
+                  "layout": self.layout, "rows": len(self)}
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump(header, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Opens a saved index; the arrays are memory-mapped unless mmap_mode is None."""
+        with open(os.path.join(path, "index.json")) as f:
+            header = json.load(f)
+        if header.get("version") != format_version:
+            raise ValueError(f"Unsupported shape index version: {header.get('version')!r}")
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in _arrays}
+        return cls(arrays, header["num_points"], header["gram"], header["layout"])
+
+    def row_steps(self, row):
+        """Canonical steps of one indexed progression."""
+        return self.steps[self.step_offsets[row]:self.step_offsets[row + 1]]
+
+    def exact(self, progression):
+        """Rows with exactly the same shape as the progression (chord indices), sorted.
+
+        Progressions of zero and one chord all have the same, empty, shape.
+        """
+        query = canonical_steps(progression, self.num_points)
+        key = _fingerprints(query, np.array([0, len(query)]))[0]
+        lo = np.searchsorted(self.fingerprints, key, side="left")
+        hi = np.searchsorted(self.fingerprints, key, side="right")
+        rows = np.sort(self.fingerprint_rows[lo:hi])
+        # Fingerprints can collide: confirm each candidate
+        return np.array([row for row in rows if np.array_equal(self.row_steps(row), query)], dtype=np.int64)
+
+    def candidates(self, query, max_distance):
+        """Rows that can be within max_distance of the query steps (either orientation)."""
+        if self.step_lengths is None:
+            self.step_lengths = np.diff(self.step_offsets)
+        length_ok = np.abs(self.step_lengths - len(query)) <= max_distance
+        # The postings count distinct grams per row, and each edit destroys at most
+        # `gram` of the query's distinct grams (negating the steps keeps them distinct)
+        keys = np.unique(_gram_keys(query, self.num_points, self.gram))
+        needed = len(keys) - max_distance * self.gram
+        if needed <= 0:
+            return np.flatnonzero(length_ok)  # Too short to filter by grams
+        negated = (self.num_points - query.astype(np.int64)) % self.num_points
+        found = []
+        for steps in (query, negated):
+            keys = np.unique(_gram_keys(steps, self.num_points, self.gram))
+            postings = [self.postings[self.gram_offsets[key]:self.gram_offsets[key + 1]] for key in keys]
+            rows, counts = np.unique(np.concatenate(postings), return_counts=True)
+            found.append(rows[counts >= needed])
+        rows = np.union1d(*found).astype(np.int64)
+        return rows[length_ok[rows]]
+
+    def lookup(self, steps, step_offsets):
+        """Rows whose shape equals each of many canonical step sequences; returns (rows, which)."""
+        keys = _fingerprints(steps, step_offsets)
+        lo = np.searchsorted(self.fingerprints, keys, side="left")
+        hi = np.searchsorted(self.fingerprints, keys, side="right")
+        counts = hi - lo
+        which = np.repeat(np.arange(len(keys)), counts)
+        rows = self.fingerprint_rows[np.repeat(lo - np.cumsum(counts) + counts, counts)
+                                     + np.arange(counts.sum())].astype(np.int64)
+        return rows, which
+
+    def similar(self, progression, max_distance=1, limit=None, neighbourhood_limit=200_000):
+        """Rows whose shape is within max_distance edits of the progression's.
+
+        Short queries enumerate every shape within max_distance and look each one
+        up by fingerprint; longer ones, whose neighbourhood would exceed about
+        neighbourhood_limit shapes, filter by shared grams and then check the
+        candidates one by one. Returns (rows, distances) sorted by distance, then
+        row; at most limit of them.
+        """
+        query = canonical_steps(progression, self.num_points)
+        matches = []
+        if ((2 * self.num_points + 1) * (len(query) + 1)) ** max_distance <= neighbourhood_limit:
+            # Neighbours of the canonical query cover the negated one too: the canonical
+            # form of a neighbour is the indexed shape either way
+            found = neighbourhood(query.tolist(), self.num_points, max_distance)
+            shapes = list(found)
+            lengths = np.array([len(shape) for shape in shapes], dtype=np.int64)
+            step_offsets = np.zeros(len(shapes) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=step_offsets[1:])
+            steps = np.fromiter((step for shape in shapes for step in shape), dtype=query.dtype,
+                                count=step_offsets[-1])
+            steps = _canonical(steps, lengths, self.num_points)
+            distances = np.array([found[shape] for shape in shapes], dtype=np.int64)
+            rows, which = self.lookup(steps, step_offsets)
+            # Fingerprints can collide: confirm each candidate, step by step
+            row_starts = np.asarray(self.step_offsets[rows])
+            same = np.asarray(self.step_offsets[rows + 1]) - row_starts == lengths[which]
+            rows, which, row_starts = rows[same], which[same], row_starts[same]
+            pair = np.repeat(np.arange(len(rows)), lengths[which])
+            position = np.arange(len(pair)) - np.repeat(np.cumsum(lengths[which]) - lengths[which], lengths[which])
+            differs = self.steps[row_starts[pair] + position] != steps[step_offsets[which][pair] + position]
+            same = np.bincount(pair[differs], minlength=len(rows)) == 0
+            rows, distances = rows[same], distances[which[same]]
+            # A row reached by several neighbours keeps the smallest distance
+            order = np.lexsort((rows, distances))
+            rows, distances = rows[order], distances[order]
+            rows, first = np.unique(rows, return_index=True)
+            matches = sorted(zip(distances[first].tolist(), rows.tolist()))
+        else:
+            negated = (self.num_points - query.astype(np.int64)) % self.num_points
+            for row in self.candidates(query, max_distance):
+                steps = self.row_steps(row).tolist()
+                distance = min(edit_distance(query.tolist(), steps, max_distance),
+                               edit_distance(negated.tolist(), steps, max_distance))
+                if distance <= max_distance:
+                    matches.append((distance, int(row)))
+            matches.sort()
+        matches = matches[:limit]
+        return (np.array([row for _, row in matches], dtype=np.int64),
+                np.array([distance for distance, _ in matches], dtype=np.int64))
@@ -0,0 +1,73 @@
+"""Checks chord and transition counts against brute force, whatever the chunking."""
+import numpy as np
+import pytest
+
+from analytics import TransitionCounts, chunk_rows, count_corpus, count_corpus_file
+from corpus_file import write_corpus
+
+
+def corpus(rng, num_rows=400, num_points=24):
+    lengths = rng.integers(0, 10, num_rows)
+    offsets = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return rng.integers(0, num_points, offsets[-1]).astype(np.uint8), offsets
+
+
+def brute_force(values, offsets, num_points=24):
+    frequencies = np.zeros(num_points, dtype=np.int64)
+    transitions = np.zeros((num_points, num_points), dtype=np.int64)
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        row = values[start:stop].tolist()
+        for chord in row:
+            frequencies[chord] += 1
+        for a, b in zip(row[:-1], row[1:]):
+            transitions[a, b] += 1
+    return frequencies, transitions
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 100, 10_000, None])
+def test_counts_do_not_depend_on_chunk_size(chunk_size):
+    values, offsets = corpus(np.random.default_rng(0))
+    frequencies, transitions = brute_force(values, offsets)
+    counts = count_corpus(values, offsets, chunk_size=chunk_size)
+    assert counts.progressions == len(offsets) - 1
+    assert (counts.frequencies == frequencies).all() and (counts.transitions == transitions).all()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1000])
+def test_chunk_rows_cover_every_row_once(chunk_size):
+    _, offsets = corpus(np.random.default_rng(1), 50)
+    ranges = chunk_rows(offsets, chunk_size)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(offsets) - 1
+    assert all(stop == next_start for (_, stop), (next_start, _) in zip(ranges[:-1], ranges[1:]))
+
+
+def test_padded_rows_and_merging_match_ragged():
+    values, offsets = corpus(np.random.default_rng(2), 100)
+    fill = 255
+    lengths = np.diff(offsets)
+    padded = np.full((len(lengths), int(lengths.max())), fill)
+    padded[np.arange(padded.shape[1]) < lengths[:, None]] = values
+    whole = TransitionCounts().add_ragged(values, offsets)
+    halves = TransitionCounts().add(padded[:50], fill=fill) + TransitionCounts().add(padded[50:], fill=fill)
+    assert halves.progressions == whole.progressions
+    assert (halves.frequencies == whole.frequencies).all() and (halves.transitions == whole.transitions).all()
+    with pytest.raises(ValueError, match="Cannot merge"):
+        whole.merge(TransitionCounts(12))
+
+
+def test_probabilities_and_top():
+    counts = TransitionCounts(3).add([[0, 1, 0, 1, 2]])
+    assert counts.top(2) == [(0, 1, 2), (1, 0, 1)]
+    assert counts.probabilities().tolist() == [[0, 1, 0], [0.5, 0, 0.5], [0, 0, 0]]
+
+
+def test_count_corpus_file_on_workers(tmp_path):
+    values, offsets = corpus(np.random.default_rng(3), 300)
+    path = tmp_path / "corpus.circ"
+    write_corpus(path, values, offsets)
+    frequencies, transitions = brute_force(values, offsets)
+    for workers in (1, 2):
+        counts = count_corpus_file(str(path), workers=workers, chunk_size=200)
+        assert counts.progressions == 300
+        assert (counts.frequencies == frequencies).all() and (counts.transitions == transitions).all()
@@ -0,0 +1,30 @@
+"""Guards the per-event cost of the app against growing with the progression length."""
+import matplotlib.pyplot as plt
+import pytest
+
+from benchmarks import check_growth, main
+from circle_gui import CircleApp
+
+
+def test_event_latency_does_not_grow_with_length(tmp_path):
+    main(["--sizes", "1000", "10000", "--events", "5", "--budget", "2", "--skip-micro",
+          "--max-growth", "3", "-o", str(tmp_path / "bench.json")])
+
+
+def test_check_growth_reports_slow_events():
+    events = {"10": {"click": {"p50_ms": 1.0}, "hover_stats": {}}, "100": {"click": {"p50_ms": 5.0}, "hover_stats": {}}}
+    check_growth(events, 5)
+    with pytest.raises(AssertionError, match="click 5.0x"):
+        check_growth(events, 4)
+
+
+def test_textbox_lists_a_bounded_number_of_chords():
+    app = CircleApp()
+    for position in range(100):
+        app.history.append(position % app.circle.num_points)
+    app.mirror_shape(None, "vertical")
+    lines = app.textbox.get_text().split("\n")
+    assert lines[1].startswith(f"… ({100 - app.textbox_chords} more), ")
+    assert len(lines[1].split(", ")) == app.textbox_chords + 1
+    assert lines[4].startswith(f"… ({100 - app.textbox_chords} more), ")
+    plt.close(app.fig)
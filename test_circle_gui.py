@@ -0,0 +1,56 @@
+"""Checks the app on layouts with fewer mirror axes and on canvases without blitting."""
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backend_bases import MouseEvent
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from circle_gui import CircleApp
+from circle_model import CircleModel, Layout
+
+
+def click(canvas, button):
+    x, y = button.ax.transAxes.transform((0.5, 0.5))
+    MouseEvent("button_press_event", canvas, x, y, button=1)._process()
+    MouseEvent("button_release_event", canvas, x, y, button=1)._process()
+
+
+def test_missing_mirror_buttons_are_disabled():
+    layout = Layout("modes", ["I", "II", "III", "IV", "V", "VI", "VII", "-"],
+                    axes={"horizontal": 0, "vertical": 1 / 4})
+    app = CircleApp(CircleModel(layout))
+    canvas = app.fig.canvas
+    canvas.draw()
+    click(canvas, app.btn_mirror_diagonal)
+    click(canvas, app.btn_mirror_diagonal_neg)
+    click(canvas, app.btn_mirror)
+    assert app.show_mirror == {"horizontal": True, "vertical": False}
+    assert set(app.mirror_lines) == {"horizontal", "vertical"}
+    assert app.ax.get_title() == "modes"  # Layouts without a title show their name
+    plt.close(app.fig)
+
+
+def test_title_comes_from_the_layout():
+    app = CircleApp(CircleModel("twelve"))
+    assert app.ax.get_title() == "Circle of Fifths"
+    plt.close(app.fig)
+
+
+def test_full_draws_paint_everything_without_blitting(monkeypatch):
+    monkeypatch.setattr(FigureCanvasAgg, "supports_blit", False)
+    app = CircleApp()
+    canvas = app.fig.canvas
+    assert not canvas.supports_blit
+    canvas.draw()
+    empty = np.asarray(canvas.buffer_rgba()).copy()
+    app.history.append(0)
+    app.history.append(8)
+    app.update_textbox()
+    app.draw_circle()
+    canvas.draw()
+    drawn = np.asarray(canvas.buffer_rgba())
+    assert not np.array_equal(drawn, empty)  # The new line and text were painted
+    assert not any(artist.get_animated() for artist in [app.textbox, app.progression_line, *app.label_artists])
+    plt.close(app.fig)
@@ -0,0 +1,140 @@
+"""Checks the headless chord geometry against the per-point trigonometry it replaced."""
+import numpy as np
+import pytest
+
+from circle_model import CircleModel, Progression, ViewCache, reflection_table, rotation_table
+
+# The original per-point mirrors, as (x, y) -> mirrored (x, y)
+point_mirrors = {
+    "horizontal": lambda x, y: (x, -y),
+    "vertical": lambda x, y: (-x, y),
+    "diagonal": lambda x, y: (y, x),
+    "diagonal_neg": lambda x, y: (-y, -x),
+}
+
+
+def nearest(angles, angle):
+    """Index of the angle closest to angle, measured around the circle."""
+    distance = np.abs((np.asarray(angles) - angle + np.pi) % (2 * np.pi) - np.pi)
+    return int(np.argmin(distance))
+
+
+@pytest.mark.parametrize("num_points", [8, 24, 48])
+@pytest.mark.parametrize("axis", sorted(point_mirrors))
+def test_reflection_table_matches_point_mirror(num_points, axis):
+    angles = np.arange(num_points) * 2 * np.pi / num_points
+    expected = []
+    for angle in angles:
+        x, y = point_mirrors[axis](np.cos(angle), np.sin(angle))
+        expected.append(nearest(angles, np.arctan2(y, x)))
+    turns = {"horizontal": 0, "vertical": 1 / 4, "diagonal": 1 / 8, "diagonal_neg": 3 / 8}[axis]
+    table = reflection_table(num_points, axis)
+    assert table.tolist() == expected
+    assert table.tolist() == [(round(2 * turns * num_points) - i) % num_points for i in range(num_points)]
+
+
+def test_reflection_table_wraps_at_the_ends():
+    horizontal = reflection_table(24, "horizontal")
+    assert horizontal[0] == 0 and horizontal[1] == 23 and horizontal[23] == 1
+    vertical = reflection_table(24, "vertical")
+    assert vertical[0] == 12 and vertical[12] == 0 and vertical[23] == 13
+    diagonal_neg = reflection_table(24, "diagonal_neg")
+    assert diagonal_neg[18] == 0 and diagonal_neg[0] == 18 and diagonal_neg[23] == 19
+
+
+@pytest.mark.parametrize("steps", [-25, -1, 0, 1, 5, 23, 24, 30])
+def test_rotation_table_matches_rotated_angles(steps):
+    # The original rotate: every label angle turned by 15 degrees per counterclockwise step
+    grid = np.arange(24) * 2 * np.pi / 24
+    label_angles = (grid + steps * np.radians(15)) % (2 * np.pi)
+    expected = [nearest(label_angles, angle) for angle in grid]
+    table = rotation_table(24, steps)
+    assert table.tolist() == expected
+    assert table.tolist() == [(i - steps) % 24 for i in range(24)]
+
+
+def test_rotation_table_wraps_at_the_ends():
+    assert rotation_table(24, 1)[0] == 23 and rotation_table(24, -1)[23] == 0
+    assert rotation_table(24, 1)[23] == 22 and rotation_table(24, -1)[0] == 1
+
+
+def test_point_lookup_wraps_near_zero():
+    circle = CircleModel()
+    step = 2 * np.pi / 24
+    for angle, position in [(0, 0), (-1e-9, 0), (2 * np.pi - 1e-9, 0), (-step / 2 + 1e-6, 0),
+                            (-step / 2 - 1e-6, 23), (np.pi, 12)]:
+        assert circle.position_at(np.cos(angle), np.sin(angle)) == position
+    circle.rotate_circle("counterclockwise")
+    assert circle.get_chord_index(np.cos(-1e-9), np.sin(-1e-9)) == 23
+    circle.rotate_circle("clockwise")
+    circle.rotate_circle("clockwise")
+    assert circle.get_chord_index(np.cos(-1e-9), np.sin(-1e-9)) == 1
+
+
+def brute_force_vertex(progression, x, y, threshold, pick):
+    """The vertex nearest to (x, y) by scanning every vertex, earliest or most recent among ties."""
+    points = np.array(progression.points, dtype=float).reshape(-1, 2)
+    if not len(points):
+        return None
+    distances = np.hypot(points[:, 0] - x, points[:, 1] - y)
+    if distances.min() > threshold:
+        return None
+    nearest = np.flatnonzero(np.isclose(distances, distances.min()))
+    return int(nearest[-1] if pick == "most_recent" else nearest[0])
+
+
+def test_vertex_at_matches_brute_force_through_edits():
+    rng = np.random.default_rng(0)
+    circle = CircleModel()
+    progression = Progression(circle)
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.5 or not len(progression):
+            progression.append(rng.integers(24))
+        elif action < 0.8:
+            progression.move(int(rng.integers(len(progression))), rng.integers(24))
+        elif action < 0.99:
+            progression.pop()
+        else:
+            progression.clear()
+        if step % 10 == 0:
+            angle, radius = rng.uniform(0, 2 * np.pi), rng.uniform(17, 23)
+            x, y = radius * np.cos(angle), radius * np.sin(angle)
+            threshold = circle.radius * 0.1  # As in the app; under half the spacing of the grid
+            for pick in ("earliest", "most_recent"):
+                assert (progression.vertex_at(x, y, threshold, pick)
+                        == brute_force_vertex(progression, x, y, threshold, pick))
+
+
+def test_vertex_at_unknown_pick():
+    progression = Progression(CircleModel())
+    progression.append(0)
+    with pytest.raises(ValueError, match="Unknown pick"):
+        progression.vertex_at(20, 0, 1, pick="latest")
+
+
+def test_view_cache_recomputes_only_after_edits():
+    circle = CircleModel()
+    progression = Progression(circle)
+    vertical = circle.mirror_tables["vertical"]
+    diagonal = circle.mirror_tables["diagonal"]
+    progression.track("vertical", vertical)  # Kept by the edits; diagonal goes through its table
+    views = ViewCache(progression)
+    for position in [0, 5, 23]:
+        progression.append(position)
+
+    first = views.get("vertical")
+    assert first.tolist() == vertical[[0, 5, 23]].tolist() and not first.flags.writeable
+    assert views.get("vertical") is first and views.get("diagonal", diagonal).tolist() == [6, 1, 7]
+    assert (views.hits, views.misses) == (1, 2)
+
+    circle.rotate_circle("clockwise")  # The labels turn; the positions and their views do not
+    assert views.get("vertical") is first
+
+    for edit in [lambda: progression.append(12), lambda: progression.move(0, 6), progression.pop,
+                 progression.clear]:
+        edit()
+        positions = np.array(progression.positions, dtype=int)
+        assert views.get("vertical").tolist() == vertical[positions].tolist()
+        assert views.get("diagonal", diagonal).tolist() == diagonal[positions].tolist()
+    assert views.misses == 2 + 2 * 4
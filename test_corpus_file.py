@@ -0,0 +1,68 @@
+"""Checks writing, reading and transforming corpus files, and the commands that take them."""
+import numpy as np
+import pytest
+
+from batch_transforms import transform_ragged
+from circle_model import Layout
+from circle_of_fifths import main
+from corpus_file import read_corpus, read_header, transform_file, write_corpus, write_corpus_batches
+
+
+def test_batches_match_write_corpus(tmp_path):
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(0, 12, 500)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = rng.integers(0, 24, offsets[-1]).astype(np.uint8)
+    # Batches of rows as read_batches yields them: slices of offsets into one values array
+    cuts = [0, 1, 1, 170, 400, 500]
+    batches = [(values, offsets[start:stop + 1]) for start, stop in zip(cuts[:-1], cuts[1:])]
+
+    write_corpus(tmp_path / "whole.circ", values, offsets, "extended", 3, ["vertical"])
+    assert write_corpus_batches(tmp_path / "batches.circ", batches, "extended", 3, ["vertical"]) == 500
+    whole, streamed = read_header(tmp_path / "whole.circ"), read_header(tmp_path / "batches.circ")
+    positions = ("values_start", "offsets_start")
+    assert {key: value for key, value in streamed.items() if key not in positions} == \
+        {key: value for key, value in whole.items() if key not in positions}
+
+    corpus = read_corpus(tmp_path / "batches.circ")
+    assert np.array_equal(corpus.values, values) and np.array_equal(corpus.offsets, offsets)
+    assert corpus.rotation == 3 and corpus.mirrors == ("vertical",)
+
+
+def test_no_batches(tmp_path):
+    assert write_corpus_batches(tmp_path / "empty.circ", [], "twelve") == 0
+    corpus = read_corpus(tmp_path / "empty.circ")
+    assert len(corpus) == 0 and len(corpus.values) == 0 and corpus.layout.name == "twelve"
+
+
+def test_unregistered_layout_round_trips(tmp_path):
+    layout = Layout("modes", ["I", "II", "III", "IV"], axes={"horizontal": 0}, title="Church Modes")
+    write_corpus(tmp_path / "modes.circ", np.array([0, 3, 1], dtype=np.uint8), [0, 3], layout)
+    loaded = read_corpus(tmp_path / "modes.circ").layout
+    assert (loaded.name, loaded.labels, loaded.axes, loaded.title) == \
+        ("modes", layout.labels, layout.axes, "Church Modes")
+
+
+def test_transform_file(tmp_path):
+    rng = np.random.default_rng(1)
+    offsets = np.concatenate([[0], np.cumsum(rng.integers(0, 9, 200))])
+    values = rng.integers(0, 24, offsets[-1]).astype(np.uint8)
+    write_corpus(tmp_path / "in.circ", values, offsets, "extended", 5, ["diagonal"])
+    assert transform_file(tmp_path / "in.circ", tmp_path / "out.circ", ["vertical", 3], chunk_size=64) == 200
+    result = read_corpus(tmp_path / "out.circ")
+    expected, _ = transform_ragged(values, offsets, ["vertical", 3])
+    assert np.array_equal(result.values, expected) and np.array_equal(result.offsets, offsets)
+    assert result.rotation == 5 and result.mirrors == ("diagonal",) and result.layout.name == "extended"
+
+
+def test_transform_command_reads_corpus_files(tmp_path, capsys):
+    text = tmp_path / "songs.txt"
+    text.write_text("C, G, Am, F\nA\n\nD Bm\n")
+    main(["pack", str(text), "-o", str(tmp_path / "songs.circ")])
+    for source, target in [(text, "from_text.txt"), (tmp_path / "songs.circ", "from_corpus.txt")]:
+        main(["transform", "-t", "vertical,clockwise", str(source), "-o", str(tmp_path / target)])
+    assert (tmp_path / "from_corpus.txt").read_text() == (tmp_path / "from_text.txt").read_text()
+    assert (tmp_path / "from_corpus.txt").read_text().startswith("Am, Dm, C, Em\n")
+    with pytest.raises(SystemExit, match="corpus uses the 'extended' layout"):
+        main(["--layout", "twelve", "transform", "-t", "vertical", str(tmp_path / "songs.circ")])
@@ -0,0 +1,117 @@
+"""Checks undo/redo of progression edits, move coalescing and the bounded log."""
+import pytest
+
+from circle_model import CircleModel, Progression
+from history import History
+
+
+@pytest.fixture
+def progression():
+    progression = Progression(CircleModel())
+    progression.track("vertical", progression.circle.mirror_tables["vertical"])
+    return progression
+
+
+def test_undo_and_redo_every_edit(progression):
+    history = History(progression)
+    states = [[]]
+    for edit in [lambda: history.append(3), lambda: history.append(8), lambda: history.move(0, 5),
+                 lambda: history.pop(), lambda: history.append(1), lambda: history.clear()]:
+        edit()
+        history.break_group()
+        states.append(list(progression.positions))
+    mirror = progression.circle.mirror_tables["vertical"]
+    for state in reversed(states[:-1]):
+        assert history.undo()
+        assert progression.positions == state
+        assert progression.view("vertical") == [mirror[p] for p in state]  # Views follow undo
+    assert not history.undo()
+    for state in states[1:]:
+        assert history.redo()
+        assert progression.positions == state
+    assert not history.redo()
+
+
+def test_undo_clear_restores_positions(progression):
+    history = History(progression)
+    for position in [4, 4, 17, 0]:
+        history.append(position)
+    history.clear()
+    assert progression.positions == [] and len(history) == 5
+    history.clear()  # Nothing to clear: not an undo step
+    assert len(history) == 5
+    history.undo()
+    assert progression.positions == [4, 4, 17, 0]
+    assert progression.vertex_at(*progression.circle.grid_point(4), 1, "earliest") == 0
+
+
+def test_new_edit_discards_redo(progression):
+    history = History(progression)
+    history.append(1)
+    history.append(2)
+    history.undo()
+    history.append(9)
+    assert not history.redo()
+    assert progression.positions == [1, 9]
+
+
+def test_moves_of_one_drag_coalesce(progression):
+    history = History(progression)
+    history.append(1)
+    history.append(2)
+    for position in [3, 4, 5]:
+        assert history.move(1, position)
+    assert not history.move(1, 5)  # Already there: nothing recorded
+    assert len(history) == 3
+    history.break_group()  # Mouse released
+    history.move(1, 6)
+    history.move(0, 7)  # Another vertex: its own step even without a break
+    assert len(history) == 5
+    history.undo()
+    assert progression.positions == [1, 6]
+    history.undo()
+    assert progression.positions == [1, 5]
+    history.undo()
+    assert progression.positions == [1, 2]  # The whole first drag at once
+    history.redo()
+    assert progression.positions == [1, 5]
+
+
+def test_moves_do_not_coalesce_when_disabled(progression):
+    history = History(progression, coalesce_moves=False)
+    history.append(1)
+    history.move(0, 2)
+    history.move(0, 3)
+    assert len(history) == 3
+
+
+def test_undo_breaks_the_move_group(progression):
+    history = History(progression)
+    history.append(1)
+    history.move(0, 2)
+    history.move(0, 3)
+    history.undo()
+    history.move(0, 4)  # Not merged into the undone drag
+    assert len(history) == 2
+    history.undo()
+    assert progression.positions == [1]
+
+
+def test_bounded_log_evicts_the_oldest(progression):
+    history = History(progression, max_edits=3)
+    for position in range(5):
+        history.append(position)
+    assert len(history) == 3 and history.evicted == 2
+    while history.undo():
+        pass
+    assert progression.positions == [0, 1]  # The two evicted appends cannot be undone
+    for _ in range(3):
+        history.redo()
+    assert progression.positions == [0, 1, 2, 3, 4]
+
+
+def test_unbounded_log(progression):
+    history = History(progression, max_edits=None)
+    for position in range(2000):
+        history.append(position % 24)
+    assert len(history) == 2000 and history.evicted == 0
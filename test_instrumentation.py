@@ -0,0 +1,45 @@
+"""Checks that a profiled canvas records its callbacks and can still disconnect them and close."""
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backend_bases import MouseEvent
+
+from circle_gui import CircleApp
+from instrumentation import Profiler
+
+
+def test_attach_records_and_disconnects():
+    fig = plt.figure()
+    canvas = fig.canvas
+    calls = []
+
+    def on_press_before(event):
+        calls.append("before")
+
+    def on_press_after(event):
+        calls.append("after")
+
+    before = canvas.mpl_connect("button_press_event", on_press_before)
+    profiler = Profiler()
+    profiler.attach(canvas)
+    after = canvas.mpl_connect("button_press_event", on_press_after)
+
+    MouseEvent("button_press_event", canvas, 10, 10, button=1)._process()
+    assert calls == ["before", "after"]
+    recorded = {name.rsplit(".", 1)[-1] for name in profiler.totals}
+    assert {"on_press_before", "on_press_after"} <= recorded
+
+    canvas.mpl_disconnect(before)
+    canvas.mpl_disconnect(after)
+    MouseEvent("button_press_event", canvas, 10, 10, button=1)._process()
+    assert calls == ["before", "after"]
+    plt.close(fig)
+
+
+def test_profiled_app_closes():
+    app = CircleApp(profiler=Profiler())
+    app.fig.canvas.draw()
+    assert "canvas.draw" in app.profiler.totals
+    plt.close(app.fig)
+    plt.close("all")
@@ -0,0 +1,14 @@
+"""Checks that the files kept with CRLF line endings (see .gitattributes) still have them."""
+import os
+
+import pytest
+
+crlf_files = ["circle_of_fifths.py", "README.md"]
+
+
+@pytest.mark.parametrize("name", crlf_files)
+def test_crlf_line_endings(name):
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), "rb") as f:
+        lines = f.read().split(b"\n")
+    assert lines[-1] == b"", f"{name} does not end with a line break"
+    assert all(line.endswith(b"\r") for line in lines[:-1]), f"{name} has lines without CRLF endings"
@@ -0,0 +1,117 @@
+"""Checks canonical forms and deduplication against brute force over each orbit."""
+import numpy as np
+import pytest
+
+from circle_model import Layout
+from orbits import CanonicalIndex, canonical_form, canonical_ragged, dedupe, group_tables, orbit
+
+
+def brute_force(row, num_points):
+    """The smallest member of a row's orbit, found by listing the whole orbit."""
+    return min(tuple(image) for image in orbit(row, num_points).tolist())
+
+
+def random_rows(rng, num_points, num_rows, length):
+    """Random rows, with repeated chords and runs of one step mixed in (they have small stabilizers)."""
+    rows = rng.integers(0, num_points, (num_rows, length))
+    rows[::5] = rows[::5, :1]
+    start, step = rng.integers(0, num_points, 2)
+    rows[1::5] = (start + step * np.arange(length)) % num_points
+    return rows
+
+
+@pytest.mark.parametrize("num_points", [24, 12, 7])
+def test_group_tables(num_points):
+    group = group_tables(num_points)
+    assert group[0].tolist() == list(range(num_points))
+    assert len({row.tobytes() for row in group}) == len(group)
+    assert (np.sort(group, axis=1) == np.arange(num_points)).all()  # Every element is a permutation
+    assert len(group_tables(24)) == 48
+
+
+@pytest.mark.parametrize("num_points", [24, 12, 7])
+@pytest.mark.parametrize("length", [1, 2, 5])
+def test_canonical_form_is_orbit_minimum(num_points, length):
+    rows = random_rows(np.random.default_rng(num_points * 10 + length), num_points, 200, length)
+    canonical, elements = canonical_form(rows, num_points, return_element=True)
+    for row, result, element in zip(rows, canonical, elements):
+        assert tuple(result.tolist()) == brute_force(row, num_points)
+        assert group_tables(num_points)[element][row].tolist() == result.tolist()
+
+
+@pytest.mark.parametrize("num_points", [24, 12, 7])
+def test_canonical_form_with_fill(num_points):
+    rng = np.random.default_rng(num_points)
+    fill = 255
+    rows = np.full((300, 6), fill)
+    lengths = rng.integers(0, 7, len(rows))
+    for row, length, values in zip(rows, lengths, random_rows(rng, num_points, len(rows), 6)):
+        row[:length] = values[:length]
+    canonical = canonical_form(rows, num_points, fill=fill)
+    for row, result, length in zip(rows, canonical, lengths):
+        assert (result[length:] == fill).all()
+        if length:
+            assert tuple(result[:length].tolist()) == brute_force(row[:length], num_points)
+
+
+def test_canonical_form_is_invariant():
+    rows = random_rows(np.random.default_rng(1), 24, 100, 8)
+    canonical = canonical_form(rows)
+    for element in group_tables(24):
+        assert (canonical_form(element[rows]) == canonical).all()
+
+
+@pytest.mark.parametrize("num_points", [24, 7])
+def test_canonical_ragged(num_points):
+    rng = np.random.default_rng(2)
+    lengths = rng.integers(0, 9, 150)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    values = rng.integers(0, num_points, offsets[-1]).astype(np.uint8)
+    canonical, result_offsets = canonical_ragged(values, offsets, num_points)
+    assert canonical.dtype == values.dtype and (result_offsets == offsets).all()
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        if stop > start:
+            assert tuple(canonical[start:stop].tolist()) == brute_force(values[start:stop], num_points)
+
+
+def test_empty_inputs():
+    assert canonical_form(np.zeros((0, 4), dtype=np.uint8)).shape == (0, 4)
+    assert canonical_form(np.zeros((3, 0), dtype=np.uint8)).shape == (3, 0)
+
+
+def test_dedupe_collapses_an_orbit():
+    progression = np.array([0, 7, 9, 5])
+    members = orbit(progression)
+    others = np.array([[0, 0, 0, 0], [0, 1, 2, 3]])
+    chunks = [members[:10], np.concatenate([others, members[10:]]), members[::-1]]
+    index = CanonicalIndex()
+    kept = list(dedupe(chunks, index=index))
+    assert [len(chunk) for chunk in kept] == [1, 2, 0]
+    assert len(index) == 3
+    assert index.counts[canonical_form(progression).astype(np.uint8).tobytes()] == 2 * len(members)
+    assert members[5] in index and others[1] in index and [0, 1, 3, 2] not in index
+
+
+def test_canonical_index_ragged_and_fill():
+    index = CanonicalIndex(12)
+    values = np.array([0, 4, 7, 1, 5, 8, 3, 3], dtype=np.uint8)  # One shape twice, a step apart, then a pair
+    offsets = np.array([0, 3, 6, 8])
+    assert index.add_ragged(values, offsets).tolist() == [True, False, True]
+    padded = np.array([[2, 6, 9, 12], [5, 5, 12, 12], [0, 12, 12, 12]])
+    assert index.add(padded, fill=12).tolist() == [False, False, True]
+    assert len(index) == 3
+
+
+def test_layout_axes_generate_the_group():
+    # No mirror axes: only the rotations are symmetries, so a shape and its mirror image differ
+    rotations_only = Layout("rotations", [str(i) for i in range(12)], axes={})
+    assert len(group_tables(layout=rotations_only)) == 12
+    assert len(group_tables(12)) == 24
+    shape, mirrored = np.array([[0, 1, 3]]), np.array([[0, 11, 9]])
+    assert (canonical_form(shape, 12) == canonical_form(mirrored, 12)).all()
+    assert (canonical_form(shape, layout=rotations_only) != canonical_form(mirrored, layout=rotations_only)).any()
+    for row in random_rows(np.random.default_rng(5), 12, 50, 4):
+        assert tuple(canonical_form(row, layout=rotations_only)[0].tolist()) == \
+            min(tuple(image) for image in orbit(row, layout=rotations_only).tolist())
+    index = CanonicalIndex(layout=rotations_only)
+    assert index.add(np.concatenate([shape, mirrored, (shape + 5) % 12])).tolist() == [True, True, False]
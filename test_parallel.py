@@ -0,0 +1,30 @@
+"""Checks that the process-pool transforms match the in-process ones."""
+import numpy as np
+
+from batch_transforms import transform
+from circle_model import Layout
+from orbits import canonical_form
+from parallel import parallel_canonical_form, parallel_transform, parallel_transform_ragged
+
+
+def test_parallel_matches_in_process():
+    rows = np.random.default_rng(0).integers(0, 24, (1000, 6), dtype=np.uint8)
+    rows[::3, 4:] = 255
+    assert (parallel_transform(rows, ["vertical", 2], fill=255, workers=2, chunk_rows=128)
+            == transform(rows, ["vertical", 2], fill=255)).all()
+    assert (parallel_canonical_form(rows, fill=255, workers=2, chunk_rows=128)
+            == canonical_form(rows, fill=255)).all()
+
+
+def test_parallel_uses_the_layout():
+    layout = Layout("rotations", [str(i) for i in range(12)], axes={"flip": 1 / 4})
+    rows = np.random.default_rng(1).integers(0, 12, (500, 4), dtype=np.uint8)
+    expected = transform(rows, ["flip", "clockwise"], layout=layout)
+    assert (parallel_transform(rows, ["flip", "clockwise"], workers=2, chunk_rows=64, layout=layout)
+            == expected).all()
+    values, offsets = parallel_transform_ragged(rows.ravel(), np.arange(0, 2001, 4), ["flip", "clockwise"],
+                                                workers=2, chunk_rows=256, layout=layout)
+    assert (values == expected.ravel()).all()
+    rotations_only = Layout("rotations", [str(i) for i in range(12)], axes={})
+    assert (parallel_canonical_form(rows, workers=2, chunk_rows=64, layout=rotations_only)
+            == canonical_form(rows, layout=rotations_only)).all()
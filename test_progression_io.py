@@ -0,0 +1,31 @@
+"""Checks that chord names parse on every layout, and that nothing else does."""
+import pytest
+
+from circle_model import get_layout
+from progression_io import format_progressions, parse_lines
+
+
+@pytest.mark.parametrize("name", ["microtonal_48", "microtonal_72"])
+def test_microtonal_labels_round_trip(name):
+    layout = get_layout(name)
+    values, offsets = parse_lines([" ".join(layout.labels)], layout.lookup, num_points=layout.num_points)
+    assert values.tolist() == list(range(layout.num_points))
+    assert format_progressions(values, offsets, layout.labels) == ", ".join(layout.labels) + "\n"
+
+
+@pytest.mark.parametrize("name", ["microtonal_48", "microtonal_72"])
+def test_microtonal_enharmonic_spellings(name):
+    layout = get_layout(name)
+    divisions = layout.num_points // 24
+    line = f"Gb F#+1:{divisions} Gb+1:{divisions}"
+    values, _ = parse_lines([line], layout.lookup, num_points=layout.num_points)
+    start = layout.labels.index("F#/Gb")
+    assert values.tolist() == [start, start + 1, start + 1]
+
+
+@pytest.mark.parametrize("name", ["microtonal_48", "microtonal_72"])
+@pytest.mark.parametrize("chord", ["2", "3", "A+1", "A+1/3", "Gb+1"])
+def test_microtonal_rejects_fragments(name, chord):
+    layout = get_layout(name)
+    with pytest.raises(ValueError, match="unknown chord"):
+        parse_lines([f"A {chord}"], layout.lookup, num_points=layout.num_points)
@@ -0,0 +1,63 @@
+"""Checks ShapeIndex.similar against a brute-force edit distance over the whole corpus."""
+import numpy as np
+import pytest
+
+from similarity import ShapeIndex, canonical_steps, edit_distance
+
+
+def brute_force(index, progression, max_distance):
+    query = canonical_steps(progression, index.num_points).tolist()
+    negated = [(index.num_points - step) % index.num_points for step in query]
+    matches = []
+    for row in range(len(index)):
+        steps = index.row_steps(row).tolist()
+        distance = min(edit_distance(query, steps, max_distance), edit_distance(negated, steps, max_distance))
+        if distance <= max_distance:
+            matches.append((distance, row))
+    matches.sort()
+    return [row for _, row in matches], [distance for distance, _ in matches]
+
+
+def corpus(rng, num_rows=300):
+    """Random progressions, with runs of fifths (repeated steps) and near copies of them mixed in."""
+    rows = []
+    for _ in range(num_rows):
+        length = int(rng.integers(0, 16))
+        kind = rng.random()
+        if kind < 0.3:
+            start, step = rng.integers(0, 24, 2)
+            row = (start + step * np.arange(length)) % 24
+        else:
+            row = rng.integers(0, 24, length)
+        if kind < 0.15 and length:
+            row[rng.integers(length)] = rng.integers(24)
+        rows.append(row)
+    offsets = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=offsets[1:])
+    return np.concatenate(rows).astype(np.uint8), offsets, rows
+
+
+@pytest.mark.parametrize("neighbourhood_limit", [200_000, 0])  # Neighbourhood lookup, then the gram filter
+@pytest.mark.parametrize("max_distance", [0, 1, 2])
+def test_similar_matches_brute_force(max_distance, neighbourhood_limit):
+    rng = np.random.default_rng(max_distance)
+    values, offsets, rows = corpus(rng)
+    index = ShapeIndex.build(values, offsets)
+    for progression in rows[:60]:
+        rows_found, distances = index.similar(progression, max_distance, neighbourhood_limit=neighbourhood_limit)
+        expected_rows, expected_distances = brute_force(index, progression, max_distance)
+        assert rows_found.tolist() == expected_rows
+        assert distances.tolist() == expected_distances
+
+
+def test_repeated_grams_reach_the_gram_threshold():
+    # 13 steps of one fifth: every gram of the query is the same
+    progression = list(range(14))
+    turned = (np.arange(14) + 7) % 24
+    mirrored = (7 - np.arange(14)) % 24
+    values = np.concatenate([progression, [5, 9], turned, mirrored]).astype(np.uint8)
+    index = ShapeIndex.build(values, [0, 14, 16, 30, 44])
+    assert index.exact(progression).tolist() == [0, 2, 3]
+    rows, distances = index.similar(progression, 2, neighbourhood_limit=0)
+    assert rows.tolist() == [0, 2, 3]
+    assert distances.tolist() == [0, 0, 0]
@@ -0,0 +1,127 @@
+"""Runs TransformService on a local port and checks its endpoints over HTTP."""
+import asyncio
+import json
+
+import pytest
+
+import transform_service
+from transform_service import TransformService
+
+
+async def request(port, method, path, body=None):
+    """Sends one HTTP request; returns (status, decoded JSON body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(payload)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + payload)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), timeout=5)
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+def run(session):
+    """Runs session(port) against a fresh service listening on a free port."""
+    async def main():
+        service = TransformService(batch_window=0.001)
+        server = await service.start(port=0)
+        async with server:
+            return await session(server.sockets[0].getsockname()[1])
+    return asyncio.run(main())
+
+
+def test_transform_names_and_indices():
+    async def session(port):
+        status, result = await request(port, "POST", "/transform",
+                                       {"progressions": [["C", "G", "Am", "F"], [0, 7], []],
+                                        "transforms": ["vertical", "clockwise"]})
+        assert status == 200
+        assert result == {"progressions": [["Am", "Dm", "C", "Em"], [13, 6], []]}
+        status, result = await request(port, "POST", "/transform",
+                                       {"progressions": [["C", "G"]], "transforms": "vertical",
+                                        "layout": "twelve"})
+        assert status == 200 and result == {"progressions": [["C", "F"]]}
+    run(session)
+
+
+def test_chords():
+    async def session(port):
+        status, result = await request(port, "POST", "/chords", {"points": [[1, 0], [0, 5], [-2, 0]]})
+        assert status == 200
+        assert result == {"chords": ["A", "C", "Eb"], "indices": [0, 6, 12]}
+        status, result = await request(port, "POST", "/chords", {"points": [[1, 0]], "rotation": 1})
+        assert status == 200 and result["indices"] == [23]
+    run(session)
+
+
+def test_metrics_count_hits_and_misses():
+    async def session(port):
+        body = {"progressions": [["C", "G"], [8, 9]], "transforms": ["horizontal"]}
+        assert (await request(port, "POST", "/transform", body))[0] == 200
+        # The same chords spelled the other way, under an equivalent chain: all cache hits
+        body = {"progressions": [[6, 4], ["F", "Dm"], ["A"]],
+                "transforms": ["horizontal", "horizontal", "horizontal"]}
+        assert (await request(port, "POST", "/transform", body))[0] == 200
+        status, metrics = await request(port, "GET", "/metrics")
+        assert status == 200
+        assert metrics["cache"]["misses"] == 3 and metrics["cache"]["hits"] == 2
+        assert metrics["cache"]["size"] == 3 and metrics["requests"] == 2
+    run(session)
+
+
+@pytest.mark.parametrize("body", [
+    b"{not json",
+    [1, 2],
+    {"progressions": "C G"},
+    {"progressions": [["C", "H"]]},
+    {"progressions": [[0, 24]]},
+    {"progressions": [[0, True]]},
+    {"progressions": [[False]]},
+    {"progressions": [["C"]], "transforms": ["bogus"]},
+    {"progressions": [["C"]], "layout": "nonexistent"},
+    {"progressions": [["C"]], "layout": 48},
+])
+def test_transform_bad_requests(body):
+    async def session(port):
+        status, result = await request(port, "POST", "/transform", body)
+        assert status == 400 and "error" in result
+    run(session)
+
+
+@pytest.mark.parametrize("body", [
+    {"points": [[1, 2, 3]]},
+    {"points": [["x", 0]]},
+    {"points": [[1, 0]], "rotation": 0.5},
+    {"points": [[1, 0]], "rotation": True},
+    {"points": [[1, 0]], "center": [0]},
+])
+def test_chords_bad_requests(body):
+    async def session(port):
+        status, _ = await request(port, "POST", "/chords", body)
+        assert status == 400
+    run(session)
+
+
+def test_unknown_endpoint_and_method():
+    async def session(port):
+        assert (await request(port, "GET", "/nowhere"))[0] == 404
+        assert (await request(port, "GET", "/transform"))[0] == 405
+    run(session)
+
+
+def test_failed_batch_fails_its_requests(monkeypatch):
+    def broken_split(*args, **kwargs):
+        raise RuntimeError("batch broke")
+
+    async def session(port):
+        body = {"progressions": [["C", "G"]], "transforms": ["vertical"]}
+        # Two requests pooled into the same batch: both must be answered, not left waiting
+        results = await asyncio.gather(request(port, "POST", "/transform", body),
+                                       request(port, "POST", "/transform", {**body, "progressions": [[1]]}))
+        for status, result in results:
+            assert status == 500 and "batch broke" in result["error"]
+        monkeypatch.undo()
+        assert (await request(port, "POST", "/transform", body))[0] == 200
+    monkeypatch.setattr(transform_service.np, "split", broken_split)
+    run(session)
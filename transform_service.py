@@ -0,0 +1,287 @@
+"""A local HTTP/JSON service for the mirror and rotate transforms (asyncio, no GUI).
+
+Tools that need the circle's transforms can run
+
+    python circle_of_fifths.py serve --port 8765            # or --unix /tmp/circle.sock
+
+and POST batches of progressions with a transform chain:
+
+    POST /transform  {"progressions": [["C", "G", "Am", "F"], [0, 7]],
+                      "transforms": ["vertical", "clockwise"], "layout": "extended"}
+    -> {"progressions": [["Am", "Dm", "C", "Em"], [13, 6]]}
+
+Chords may be names or indices; each result uses the same form as its input.
+The optional "layout" names a registered layout (default "extended").
+POST /chords maps (x, y) points around the circle (at any radius) to the chord
+under them, as CircleModel.get_chord_from_point does, for a given rotation.
+GET /metrics reports the cache and latency counters.
+
+Results are kept in a bounded LRU cache keyed on the normalized progression
+(chord indices, whatever the spelling of the names) and the folded transform
+table, so chains that amount to the same permutation share entries.
+Progressions that miss the cache are not transformed one request at a time:
+requests arriving within batch_window seconds of each other are pooled and
+every distinct transform table is applied to all of their misses in one
+vectorized gather.
+"""
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from batch_transforms import transform_table
+from circle_model import get_layout
+
+# Progressions kept in the result cache
+default_cache_size = 1 << 17
+# Seconds to wait for more requests to batch with the first one
+default_batch_window = 0.002
+# Request latencies kept for the percentiles in /metrics
+latency_samples = 10_000
+# Largest request body accepted, in bytes
+max_body = 64 << 20
+# Transform chains whose folded tables are kept; the oldest is dropped past this
+max_chains = 4096
+
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def _request_layout(request):
+    """The registered layout named in a request (clients cannot define new layouts)."""
+    name = request.get("layout", "extended")
+    if not isinstance(name, str):
+        raise ValueError("layout must be the name of a registered layout")
+    return get_layout(name)  # ValueError for unknown names
+
+
+class TransformService:
+    """Transforms batches of progressions through an LRU cache and a request batcher."""
+
+    def __init__(self, cache_size=default_cache_size, batch_window=default_batch_window):
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.cache = collections.OrderedDict()  # (table id, chord bytes) -> transformed chords
+        self.tables = {}  # (layout, chain) -> (table id, table), oldest chain first
+        self.table_ids = {}  # (layout, table bytes) -> id, so equal permutations share cache entries
+        self.pending = []  # (table id, table, progressions, future) waiting for the batcher
+        self.batch_task = None
+        self.latencies = collections.deque(maxlen=latency_samples)  # Seconds per request
+        self.counters = collections.Counter()
+
+    def table(self, chain, layout):
+        """The folded permutation table of a chain, with its id in the cache keys."""
+        key = (layout, tuple(chain))  # Layouts compare by identity
+        if key not in self.tables:
+            table = transform_table(chain, layout=layout)
+            table_id = self.table_ids.setdefault((layout, table.tobytes()), len(self.table_ids))
+            self.tables[key] = (table_id, table)
+            if len(self.tables) > max_chains:
+                del self.tables[next(iter(self.tables))]
+        return self.tables[key]
+
+    async def transform(self, progressions, chain, layout="extended"):
+        """Transforms progressions (sequences of chord indices); returns one array per progression."""
+        layout = get_layout(layout)
+        table_id, table = self.table(chain, layout)
+        results = [None] * len(progressions)
+        misses = []
+        for i, progression in enumerate(progressions):
+            chords = np.asarray(progression, dtype=layout.dtype)
+            key = (table_id, chords.tobytes())
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                results[i] = cached
+            else:
+                misses.append((i, key, chords))
+        self.counters["hits"] += len(progressions) - len(misses)
+        self.counters["misses"] += len(misses)
+
+        if misses:
+            future = asyncio.get_running_loop().create_future()
+            self.pending.append((table_id, table, [chords for _, _, chords in misses], future))
+            if self.batch_task is None:
+                self.batch_task = asyncio.create_task(self.run_batch())
+            for (i, key, _), transformed in zip(misses, await future):
+                results[i] = transformed
+                self.cache[key] = transformed
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.counters["evictions"] += 1
+        return results
+
+    async def run_batch(self):
+        """Waits out the batch window, then transforms every pending miss, one gather per table."""
+        await asyncio.sleep(self.batch_window)
+        pending, self.pending = self.pending, []
+        self.batch_task = None
+        groups = collections.defaultdict(list)
+        for table_id, table, chords, future in pending:
+            groups[table_id].append((table, chords, future))
+        try:
+            for requests in groups.values():
+                table = requests[0][0]
+                rows = [chords for _, chords, _ in requests for chords in chords]
+                lengths = [len(chords) for chords in rows]
+                values = table[np.concatenate(rows)] if rows else np.zeros(0, dtype=table.dtype)
+                # Copies, so that a cached row does not keep the whole batch alive
+                transformed = [row.copy() for row in np.split(values, np.cumsum(lengths)[:-1])]
+                for row in transformed:
+                    row.setflags(write=False)  # Shared with the cache
+                start = 0
+                for _, chords, future in requests:
+                    if not future.done():
+                        future.set_result(transformed[start:start + len(chords)])
+                    start += len(chords)
+        except Exception as exc:
+            # Fail the batched requests instead of leaving them waiting forever
+            for _, _, _, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+        self.counters["batches"] += 1
+        self.counters["batched_requests"] += len(pending)
+
+    async def handle_transform(self, request):
+        """Answers a /transform request body: names or indices in, the same out."""
+        layout = _request_layout(request)
+        chain = request.get("transforms", [])
+        if isinstance(chain, str):
+            chain = [chain]
+        progressions = request.get("progressions")
+        if not isinstance(progressions, list) or not isinstance(chain, list):
+            raise ValueError("expected a list of progressions and a list of transforms")
+        indices = []
+        named = []
+        for progression in progressions:
+            if not isinstance(progression, list):
+                raise ValueError("every progression must be a list of chords")
+            is_named = bool(progression) and all(isinstance(chord, str) for chord in progression)
+            if is_named:
+                unknown = [chord for chord in progression if chord not in layout.lookup]
+                if unknown:
+                    raise ValueError(f"unknown chord {unknown[0]!r}")
+                progression = [layout.lookup[chord] for chord in progression]
+            # type() rather than isinstance(): JSON true and false are bools, which are ints too
+            elif not all(type(chord) is int and 0 <= chord < layout.num_points for chord in progression):
+                raise ValueError(f"chords must be names or indices below {layout.num_points}")
+            indices.append(progression)
+            named.append(is_named)
+        results = await self.transform(indices, chain, layout)
+        labels = layout.labels
+        return {"progressions": [[labels[i] for i in result.tolist()] if is_named else result.tolist()
+                                 for result, is_named in zip(results, named)]}
+
+    def handle_chords(self, request):
+        """Answers a /chords request: the chord under each (x, y) point for a rotation."""
+        layout = _request_layout(request)
+        points = np.asarray(request.get("points", []), dtype=float)
+        if points.size == 0:
+            points = points.reshape(0, 2)
+        if points.ndim != 2 or points.shape[1] != 2 or not np.isfinite(points).all():
+            raise ValueError("points must be a list of [x, y] pairs of numbers")
+        center = np.asarray(request.get("center", [0, 0]), dtype=float)
+        if center.shape != (2,) or not np.isfinite(center).all():
+            raise ValueError("center must be an [x, y] pair of numbers")
+        rotation = request.get("rotation", 0)
+        if type(rotation) is not int:  # Not a bool either
+            raise ValueError("rotation must be a whole number of steps")
+        angles = np.arctan2(points[:, 1] - center[1], points[:, 0] - center[0])
+        positions = np.rint(angles / layout.angle_step).astype(np.int64) % layout.num_points
+        chords = layout.rotation(rotation)[positions]
+        return {"chords": [layout.labels[i] for i in chords.tolist()], "indices": chords.tolist()}
+
+    def metrics(self):
+        counters = self.counters
+        lookups = counters["hits"] + counters["misses"]
+        latencies = np.asarray(self.latencies) * 1e3
+        result = {
+            "requests": counters["requests"], "errors": counters["errors"],
+            "cache": {"size": len(self.cache), "capacity": self.cache_size, "hits": counters["hits"],
+                      "misses": counters["misses"], "evictions": counters["evictions"],
+                      "hit_rate": counters["hits"] / lookups if lookups else 0.0},
+            "batches": counters["batches"],
+            "requests_per_batch": counters["batched_requests"] / counters["batches"] if counters["batches"] else 0.0,
+        }
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            result["latency_ms"] = {"p50": p50, "p90": p90, "p99": p99, "max": float(latencies.max())}
+        return result
+
+    async def respond(self, method, path, body):
+        """Routes one HTTP request; returns (status, JSON-able result)."""
+        routes = {"/transform": "POST", "/chords": "POST", "/metrics": "GET", "/health": "GET"}
+        if path not in routes:
+            return 404, {"error": f"no such endpoint: {path}"}
+        if method != routes[path]:
+            return 405, {"error": f"{path} expects {routes[path]}"}
+        if path == "/metrics":
+            return 200, self.metrics()
+        if path == "/health":
+            return 200, {"status": "ok"}
+        try:
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+            if path == "/chords":
+                return 200, self.handle_chords(request)
+            return 200, await self.handle_transform(request)
+        except (ValueError, TypeError) as exc:  # json.JSONDecodeError is a ValueError
+            return 400, {"error": str(exc)}
+        except Exception as exc:  # Answer anyway, rather than dropping the connection
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def handle_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection, keeping it alive between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                start = time.perf_counter()
+                method, path, *_ = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > max_body:
+                    status, result = 413, {"error": "request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, result = await self.respond(method, path.split("?")[0], body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                payload = json.dumps(result).encode()
+                writer.write(f"HTTP/1.1 {status} {_reasons[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                self.counters["requests"] += 1
+                self.counters["errors"] += status != 200
+                self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # Malformed request or client gone: drop the connection
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """Starts listening on host:port, or on the Unix socket at path; returns the asyncio server."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(host="127.0.0.1", port=8765, path=None, **options):
+    """Runs a TransformService until cancelled; options go to TransformService."""
+    service = TransformService(**options)
+    server = await service.start(host, port, path)
+    async with server:
+        await server.serve_forever()